@@ -0,0 +1,72 @@
+"""
+Convoy arrivals: K single allocations + K history commits vs one batch.
+
+For each convoy of --convoy vehicles, the single path calls ParkingLot.allocate
+and crud.create_history once per vehicle (what K /find_shortest_parking_lot +
+/history round trips do server-side). The batch path calls
+ParkingLot.allocate_many once and crud.create_histories once, as
+/allocate_batch does. History goes to a throwaway SQLite file. Adjacent
+batches are timed separately.
+
+Usage:
+    python -m benchmarks.bench_batch_allocation [--size 500] [--convoy 50] [--convoys 40]
+"""
+import argparse
+import contextlib
+import datetime
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from benchmarks.bench_path_finder import garage_config
+from database import Base
+from path_finders import ParkingLot, PathFinder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=500)
+    parser.add_argument('--convoy', type=int, default=50)
+    parser.add_argument('--convoys', type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'history.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        print(f"{args.size}x{args.size} lot, {args.convoys} convoys of {args.convoy}")
+
+        def single(lot, db):
+            for i in range(args.convoy):
+                x, y = lot.allocate()
+                crud.create_history(db, f"CAR{i}", f"{x},{y}", "Parked", datetime.datetime.now())
+
+        def batch(lot, db, adjacent=False):
+            now = datetime.datetime.now()
+            locations = lot.allocate_many(args.convoy, adjacent=adjacent)
+            crud.create_histories(db, [{"number_plate": f"CAR{i}", "position": f"{x},{y}",
+                                        "status": "Parked", "time": now}
+                                       for i, (x, y) in enumerate(locations)])
+
+        modes = (('single', single), ('batch', batch),
+                 ('adjacent', lambda lot, db: batch(lot, db, adjacent=True)))
+        for name, arrive in modes:
+            lot = ParkingLot("bench", PathFinder(garage_config(args.size)))
+            db = Session()
+            # PathFinder prints a line per park
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                for _ in range(args.convoys):
+                    arrive(lot, db)
+                seconds = time.perf_counter() - start
+            db.close()
+            print(f"  {name:>8}: {seconds / args.convoys * 1e3:8.2f} ms per convoy "
+                  f"({args.convoys * args.convoy / seconds:,.0f} vehicles/s)")
+
+
+if __name__ == "__main__":
+    main()
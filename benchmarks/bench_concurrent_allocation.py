@@ -0,0 +1,136 @@
+"""
+Concurrent spot allocation: double bookings, allocator integrity and throughput.
+
+--threads workers share --lots lots and run --allocations allocations in
+total. With --churn, each worker also releases one of its earlier spots
+half of the time. An owner table records who holds which spot; taking a
+spot that is already held counts as a double booking, and an allocation
+that returns no spot although the lot has room counts as failed. Afterwards
+the grid, the parked set and the spot allocators are checked against each
+other.
+
+The locked run uses ParkingLot.allocate, the path /find_shortest_parking_lot
+takes. The unlocked run calls find_shortest_blank_position + park_vehicle
+on the shared PathFinder with no lock, as the endpoint used to.
+
+Usage:
+    python -m benchmarks.bench_concurrent_allocation [--threads 64] [--allocations 20000] [--churn]
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_path_finder import garage_config
+from path_finders import ParkingLot, PathFinder
+from path_finders.base_path_finder import PARKED
+
+
+def unlocked_allocate(lot):
+    position = lot.path_finder.find_shortest_blank_position()
+    if position is None or not lot.path_finder.park_vehicle(position):
+        return None
+    return position
+
+
+def unlocked_unpark(lot, position):
+    return lot.path_finder.remove_parked_position(position)
+
+
+def allocator_errors(pf):
+    """Heap-order violations plus free-spot keys that differ from a fresh rebuild"""
+    errors = 0
+    heaps = []
+    for spots in pf.entrance_spots:
+        heap = spots._heap
+        errors += sum(heap[i] < heap[(i - 1) // 2] for i in range(1, len(heap)))
+        heaps.append(sorted(heap))
+    pf._update_blank_positions()
+    return errors + sum(len(set(a) ^ set(sorted(b._heap))) for a, b in zip(heaps, pf.entrance_spots))
+
+
+def run(lots, allocate, unpark, threads, allocations, churn):
+    owners, owners_lock = {}, threading.Lock()
+    stats = {'allocated': 0, 'failed': 0, 'double': 0}
+    per_thread = allocations // threads
+
+    def worker(worker_id):
+        rng = random.Random(worker_id)
+        held = []
+        for _ in range(per_thread):
+            lot = lots[rng.randrange(len(lots))]
+            if churn and held and rng.random() < 0.5:
+                lot_held, position = held.pop(rng.randrange(len(held)))
+                with owners_lock:
+                    del owners[(lot_held.lot_id, position)]
+                unpark(lot_held, position)
+                continue
+            position = allocate(lot)
+            with owners_lock:
+                if position is None:
+                    stats['failed'] += 1
+                    continue
+                stats['allocated'] += 1
+                if (lot.lot_id, position) in owners:
+                    stats['double'] += 1
+                owners[(lot.lot_id, position)] = worker_id
+            held.append((lot, position))
+
+    # Switch threads often so unprotected interleavings actually happen
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(worker, range(threads)))
+        seconds = time.perf_counter() - start
+    finally:
+        sys.setswitchinterval(interval)
+
+    inconsistent = 0
+    for lot in lots:
+        pf = lot.path_finder
+        held = {position for lot_id, position in owners if lot_id == lot.lot_id}
+        grid = {tuple(p) for p in np.argwhere(pf.status_matrix == PARKED).tolist()}
+        inconsistent += len(held ^ grid) + len(held ^ set(pf.parked_positions)) + allocator_errors(pf)
+    return stats, inconsistent, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--allocations', type=int, default=20000)
+    parser.add_argument('--lots', type=int, default=1)
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--churn', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.allocations} operations over {args.lots} lot(s) "
+          f"of {args.size}x{args.size}{' with churn' if args.churn else ''}")
+    print(f"{'mode':>9} {'allocs/s':>10} {'allocated':>10} {'failed':>7} {'double':>7} {'inconsistent':>13}")
+    modes = (('locked', ParkingLot.allocate, ParkingLot.unpark),
+             ('unlocked', unlocked_allocate, unlocked_unpark))
+    for mode, allocate, unpark in modes:
+        lots = [ParkingLot(f"lot-{i}", PathFinder(garage_config(args.size))) for i in range(args.lots)]
+        # PathFinder prints a line per park/unpark
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            try:
+                result = run(lots, allocate, unpark, args.threads, args.allocations, args.churn)
+            except Exception as e:  # A corrupted heap can raise mid-run
+                result = e
+        if isinstance(result, Exception):
+            print(f"{mode:>9} crashed: {result!r}")
+            continue
+        stats, inconsistent, seconds = result
+        print(f"{mode:>9} {stats['allocated'] / seconds:>10,.0f} {stats['allocated']:>10} "
+              f"{stats['failed']:>7} {stats['double']:>7} {inconsistent:>13}")
+
+
+if __name__ == "__main__":
+    main()
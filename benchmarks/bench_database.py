@@ -0,0 +1,138 @@
+"""
+Mixed reads and writes on the history table: bare SQLite engine vs build_engine.
+
+Both engines get a copy of the same database pre-filled with --rows history
+rows. For --seconds, --readers threads look up the latest rows of a random
+plate and count a time window, while --writers threads insert and commit one
+row at a time. "bare" is the previous create_engine call (rollback journal,
+synchronous=FULL); "tuned" is database.build_engine with the Config defaults
+(WAL, synchronous=NORMAL, mmap, cache, busy timeout, pool sizing).
+
+Usage:
+    python -m benchmarks.bench_database [--rows 200000] [--readers 8] [--writers 2] [--seconds 5]
+"""
+import argparse
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from config import Config
+from database import Base, build_engine
+from models import History
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def fill(path, rows, plates):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with engine.begin() as connection:
+        for offset in range(0, rows, 50_000):
+            connection.execute(insert(History), [
+                {"number_plate": f"P{rng.randrange(plates):05d}", "position": f"{i % 40},{i % 37}",
+                 "status": "Parked" if i % 2 else "Unparked", "time": START + datetime.timedelta(seconds=i)}
+                for i in range(offset, min(rows, offset + 50_000))])
+    engine.dispose()
+
+
+def run(engine, args):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    stop = threading.Event()
+    latencies = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def reader(seed):
+        rng = random.Random(seed)
+        local, failed = [], 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    plate = f"P{rng.randrange(args.plates):05d}"
+                    db.scalars(select(History).where(History.number_plate == plate)
+                               .order_by(History.time.desc()).limit(20)).all()
+                    since = START + datetime.timedelta(seconds=rng.randrange(args.rows))
+                    db.scalar(select(func.count()).select_from(History).where(
+                        History.time >= since, History.time < since + datetime.timedelta(hours=1)))
+                local.append(time.perf_counter() - start)
+            except Exception:
+                failed += 1
+        with lock:
+            latencies['read'] += local
+            errors['read'] += failed
+
+    def writer(seed):
+        rng = random.Random(seed)
+        local, failed = [], 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.add(History(number_plate=f"P{rng.randrange(args.plates):05d}", position="B3",
+                                   status="Parked", time=datetime.datetime.now()))
+                    db.commit()
+                local.append(time.perf_counter() - start)
+            except Exception:
+                failed += 1
+        with lock:
+            latencies['write'] += local
+            errors['write'] += failed
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--plates', type=int, default=20_000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        seed = os.path.join(directory, 'seed.db')
+        fill(seed, args.rows, args.plates)
+        print(f"{args.rows} rows, {args.readers} readers + {args.writers} writers for {args.seconds:.0f}s")
+        print(f"{'engine':>6} {'reads/s':>9} {'read p99':>9} {'writes/s':>9} {'write p99':>10} {'errors':>7}")
+
+        for name in ('bare', 'tuned'):
+            path = os.path.join(directory, f'{name}.db')
+            shutil.copy(seed, path)
+
+            class BenchConfig(Config):
+                database_url = f"sqlite:///{path}"
+
+            if name == 'bare':
+                engine = create_engine(BenchConfig.database_url, connect_args={"check_same_thread": False})
+            else:
+                engine = build_engine(BenchConfig)
+            latencies, errors = run(engine, args)
+            engine.dispose()
+
+            reads, writes = np.array(latencies['read']), np.array(latencies['write'])
+            p99 = lambda values: np.percentile(values, 99) * 1e3 if values.size else float('nan')
+            print(f"{name:>6} {reads.size / args.seconds:>9,.0f} {p99(reads):>7.1f}ms "
+                  f"{writes.size / args.seconds:>9,.0f} {p99(writes):>8.1f}ms {errors['read'] + errors['write']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Latency and accuracy of the detector backends on local images.
+
+Every backend whose weights exist is run on the same letterboxed images.
+Accuracy is reported against the PyTorch backend's boxes as reference:
+recall / precision of boxes matched at IoU >= 0.5 and the mean IoU of matches.
+
+Usage:
+    python -m benchmarks.bench_detector_backends --images path/to/gate/images
+"""
+import argparse
+import copy
+import os
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from model.detectors import DETECTOR_BACKENDS, build_detector
+from model.stream import box_iou
+from utils.preprocessing import letterbox
+
+from export_detector import list_images
+
+
+def match(reference, boxes, iou_threshold=0.5):
+    """(matched count, sum of matched IoUs) with greedy one-to-one matching"""
+    if len(reference) == 0 or len(boxes) == 0:
+        return 0, 0.0
+    ious = box_iou(reference, boxes)
+    matched, total_iou = 0, 0.0
+    while ious.size and ious.max() >= iou_threshold:
+        i, j = np.unravel_index(ious.argmax(), ious.shape)
+        matched += 1
+        total_iou += ious[i, j]
+        ious[i, :] = -1
+        ious[:, j] = -1
+    return matched, total_iou
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', required=True)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=1)
+    args = parser.parse_args()
+
+    base_config = Config()
+    weights = {'torch': base_config.yolo_weights_file, 'onnx': base_config.onnx_weights_file,
+               'onnx-int8': base_config.onnx_int8_weights_file}
+    frames = [letterbox(cv2.imread(path), base_config.img_size)[0]
+              for path in list_images(args.images, args.limit)]
+    batches = [frames[i:i + args.batch_size] for i in range(0, len(frames), args.batch_size)]
+
+    outputs = {}
+    print(f"{'backend':>10} {'mean ms/frame':>14} {'p95 ms/batch':>13} {'recall':>7} {'precision':>10} {'mean IoU':>9}")
+    for backend in DETECTOR_BACKENDS:
+        if not os.path.exists(weights[backend]):
+            print(f"{backend:>10} skipped, {weights[backend]} not found")
+            continue
+        config = copy.copy(base_config)
+        config.detector_backend = backend
+        detector = build_detector(config)
+        detector(batches[0])  # warm-up
+
+        latencies, detections = [], []
+        for batch in batches:
+            start = time.perf_counter()
+            detections.extend(detector(batch))
+            latencies.append((time.perf_counter() - start) * 1000)
+        outputs[backend] = detections
+
+        reference = outputs.get('torch', detections)
+        matched = total_iou = ref_count = count = 0
+        for (ref_boxes, _), (boxes, _) in zip(reference, detections):
+            m, iou = match(ref_boxes, boxes)
+            matched, total_iou = matched + m, total_iou + iou
+            ref_count, count = ref_count + len(ref_boxes), count + len(boxes)
+        print(f"{backend:>10} {sum(latencies) / len(frames):>14.2f} {np.percentile(latencies, 95):>13.2f} "
+              f"{matched / max(ref_count, 1):>7.3f} {matched / max(count, 1):>10.3f} "
+              f"{total_iou / max(matched, 1):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+/history query latency and insert cost: legacy single-column indexes vs the composite set.
+
+Fills a throwaway SQLite history table with --rows rows (--plates plates,
+two statuses, one row per second), then for each index set times the
+crud.query_histories calls behind GET /history:
+
+    plate         newest page of one plate
+    plate+range   one plate within a one-day window
+    status        newest page of one status
+    range         newest page of a one-hour window
+    deep keyset   status page ~--deep rows in, from a (time, id) cursor
+    deep offset   the same page via OFFSET, for comparison
+    export        rows/s of crud.iter_histories over one day
+
+and the index size plus the cost of inserting --inserts rows in 500-row batches.
+
+Usage:
+    python -m benchmarks.bench_history_queries [--rows 1000000]   # --rows 10000000 for the 10M table
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from models import History, LEGACY_HISTORY_INDEXES
+
+START = datetime.datetime(2024, 1, 1)
+LEGACY_COLUMNS = dict(zip(LEGACY_HISTORY_INDEXES + ('ix_history_time',),
+                          ('id', 'number_plate', 'position', 'status', 'time')))
+
+
+def fill(path, rows, plates):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute("CREATE TABLE history (id INTEGER PRIMARY KEY, number_plate VARCHAR, "
+                       "position VARCHAR, status VARCHAR, time DATETIME)")
+    rng = np.random.default_rng(0)
+    base = np.datetime64(START.isoformat(), 'us')
+    for offset in range(0, rows, 1_000_000):
+        n = min(rows, offset + 1_000_000) - offset
+        seconds = np.arange(offset, offset + n)
+        # SQLAlchemy's SQLite DateTime format: 'YYYY-MM-DD HH:MM:SS.ffffff'
+        times = np.char.replace((base + seconds * 1_000_000).astype(str), 'T', ' ')
+        times = np.char.add(times, np.where(np.char.find(times, '.') < 0, '.000000', ''))
+        plate_ids = rng.integers(0, plates, n)
+        connection.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?)", zip(
+            (seconds + 1).tolist(), np.char.mod('P%06d', plate_ids).tolist(),
+            np.char.mod('%d,3', seconds % 40).tolist(), np.where(seconds % 2, 'Parked', 'Unparked').tolist(),
+            times.tolist()))
+        connection.commit()
+    connection.close()
+
+
+def use_indexes(engine, legacy):
+    with engine.begin() as connection:
+        for index in History.__table__.indexes:
+            connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+        for name in LEGACY_HISTORY_INDEXES:
+            connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+        if legacy:
+            for name, column in LEGACY_COLUMNS.items():
+                connection.exec_driver_sql(f"CREATE INDEX {name} ON history ({column})")
+        else:
+            for index in History.__table__.indexes:
+                index.create(connection)
+        connection.exec_driver_sql("ANALYZE")
+
+
+def index_bytes(engine):
+    with engine.connect() as connection:
+        size = connection.exec_driver_sql(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'history')").scalar()
+    return size or 0
+
+
+def median_ms(call, params):
+    timings = []
+    for param in params:
+        start = time.perf_counter()
+        call(param)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--plates', type=int, default=50_000)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--deep', type=int, default=100_000)
+    parser.add_argument('--inserts', type=int, default=20_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.db')
+        start = time.perf_counter()
+        fill(path, args.rows, args.plates)
+        print(f"{args.rows:,} rows filled in {time.perf_counter() - start:.0f}s")
+        engine = create_engine(f"sqlite:///{path}")
+        Session = sessionmaker(bind=engine)
+
+        plates = [f"P{rng.randrange(args.plates):06d}" for _ in range(args.repeats)]
+        days = [START + datetime.timedelta(seconds=rng.randrange(max(1, args.rows - 86400)))
+                for _ in range(args.repeats)]
+        statuses = [rng.choice(['Parked', 'Unparked']) for _ in range(args.repeats)]
+        hour = datetime.timedelta(hours=1)
+        day = datetime.timedelta(days=1)
+
+        for name, legacy in (('legacy', True), ('composite', False)):
+            start = time.perf_counter()
+            use_indexes(engine, legacy)
+            seconds = time.perf_counter() - start
+            print(f"\n{name} indexes: {index_bytes(engine) / 2**20:,.0f} MB, built in {seconds:.0f}s")
+            with Session() as db:
+                # Cursor for the deep page: the row --deep positions into the newest 'Parked' rows
+                deep_row = db.scalars(select(History).where(History.status == 'Parked')
+                                      .order_by(History.time.desc(), History.id.desc())
+                                      .offset(args.deep).limit(1)).first()
+                queries = {
+                    'plate': (lambda p: crud.query_histories(db, number_plate=p), plates),
+                    'plate+range': (lambda i: crud.query_histories(db, number_plate=plates[i], start=days[i],
+                                                                   end=days[i] + day), range(args.repeats)),
+                    'status': (lambda s: crud.query_histories(db, status=s), statuses),
+                    'range': (lambda d: crud.query_histories(db, start=d, end=d + hour), days),
+                    'deep keyset': (lambda _: crud.query_histories(db, status='Parked',
+                                                                   after=(deep_row.time, deep_row.id)),
+                                    range(args.repeats)),
+                    'deep offset': (lambda _: db.scalars(select(History).where(History.status == 'Parked')
+                                                         .order_by(History.time.desc(), History.id.desc())
+                                                         .offset(args.deep).limit(100)).all(),
+                                    range(args.repeats)),
+                }
+                for label, (call, params) in queries.items():
+                    print(f"  {label:>12}: {median_ms(call, params):9.2f} ms")
+                    db.expunge_all()
+
+                start = time.perf_counter()
+                exported = sum(1 for _ in crud.iter_histories(db, start=days[0], end=days[0] + day))
+                print(f"  {'export':>12}: {exported / (time.perf_counter() - start):9,.0f} rows/s")
+
+            # Rolled back afterwards so both index sets query the same table
+            start = time.perf_counter()
+            with engine.connect() as connection:
+                transaction = connection.begin()
+                now = datetime.datetime.now()
+                for offset in range(0, args.inserts, 500):
+                    connection.execute(insert(History), [
+                        {"number_plate": f"P{rng.randrange(args.plates):06d}", "position": "1,3",
+                         "status": "Parked", "time": now} for _ in range(500)])
+                seconds = time.perf_counter() - start
+                transaction.rollback()
+            print(f"  {'inserts':>12}: {args.inserts / seconds:9,.0f} rows/s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
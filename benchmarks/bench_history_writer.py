@@ -0,0 +1,85 @@
+"""
+History writes under a gate burst: commit per event vs the write-behind HistoryWriter.
+
+--threads handlers each record --events history rows. The direct mode opens a
+session and calls crud.create_history per event (add, commit, refresh), as
+/history did. The write-behind mode submits to a HistoryWriter and stops it at
+the end, so the timing includes writing every row. Rows go to a throwaway
+SQLite file.
+
+Usage:
+    python -m benchmarks.bench_history_writer [--threads 16] [--events 500]
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from config import Config
+from database import Base
+from history_writer import HistoryWriter
+from models import History
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--events', type=int, default=500, help="events per thread")
+    args = parser.parse_args()
+    total = args.threads * args.events
+    config = Config()
+
+    def row(worker, i):
+        return {"number_plate": f"{worker:02d}-{i:05d}", "position": "B3", "status": "Parked",
+                "time": datetime.datetime.now()}
+
+    print(f"{args.threads} threads x {args.events} events")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('direct', 'write-behind'):
+            engine = create_engine(f"sqlite:///{os.path.join(directory, mode + '.db')}",
+                                   connect_args={"check_same_thread": False})
+            Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            writer = HistoryWriter(Session, config) if mode == 'write-behind' else None
+
+            def direct(worker):
+                for i in range(args.events):
+                    db = Session()
+                    try:
+                        crud.create_history(db, **row(worker, i))
+                    finally:
+                        db.close()
+
+            def write_behind(worker):
+                for i in range(args.events):
+                    writer.submit(row(worker, i))
+
+            start = time.perf_counter()
+            if writer is not None:
+                writer.start()
+            with ThreadPoolExecutor(args.threads) as pool:
+                list(pool.map(direct if writer is None else write_behind, range(args.threads)))
+            submitted = time.perf_counter() - start
+            if writer is not None:
+                writer.stop()
+            seconds = time.perf_counter() - start
+
+            with Session() as db:
+                stored = db.scalar(select(func.count()).select_from(History))
+            line = f"  {mode:>12}: {total / seconds:>9,.0f} rows/s, handlers done after {submitted:.2f}s"
+            if writer is not None:
+                stats = writer.get_stats()
+                line += (f", {stats['batches_written']} batches (mean {stats['mean_batch_size']:.0f}), "
+                         f"max lag {stats['max_lag_ms']:.0f} ms")
+            print(line + f", {stored}/{total} stored")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Payload size and CPU cost of the base64/JSON image path against the binary path.
+
+Old path (/predict/base64/): JSON + data URL in, b64decode, full-size imdecode,
+BGR->RGB, resize; annotated images RGB->BGR, JPEG, base64 in JSON out.
+New path (/predict/binary/): raw bytes in, imdecode straight to BGR (reduced
+scale for frames larger than Config.frame_min_decode_size); annotated JPEG
+bytes out.
+
+Usage:
+    python -m benchmarks.bench_image_transport --image path/to/frame.jpg
+"""
+import argparse
+import base64
+import json
+import time
+
+import cv2
+import numpy as np
+
+from utils.preprocessing import decode_image
+
+
+def old_request(body: str):
+    image_b64 = json.loads(body)["image"].split(',')[1]
+    image = cv2.imdecode(np.frombuffer(base64.b64decode(image_b64), np.uint8), cv2.IMREAD_COLOR)
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return cv2.resize(image, (640, 640))
+
+
+def new_request(body: bytes):
+    # The recognizer letterboxes internally; the frame only needs decoding
+    return decode_image(body, min_size=(1280, 720))
+
+
+def old_response(images):
+    encoded = []
+    for img in images:
+        _, buffer = cv2.imencode('.jpg', cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+        encoded.append(base64.b64encode(buffer).decode('utf-8'))
+    return json.dumps({"result_images": encoded})
+
+
+def new_response(images):
+    return [cv2.imencode('.jpg', img)[1].tobytes() for img in images]
+
+
+def time_call(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--image', default=None, help="JPEG to use (default: synthetic 720p, 1080p and 4K frames)")
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            frames = [(args.image, f.read())]
+    else:
+        rng = np.random.default_rng(0)
+        frames = []
+        for width, height in [(1280, 720), (1920, 1080), (3840, 2160)]:
+            frame = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (15, 15), 5)
+            frames.append((f"{width}x{height}", cv2.imencode('.jpg', frame)[1].tobytes()))
+
+    plates = [np.full((90, 250, 3), 128, dtype=np.uint8) for _ in range(3)]
+    old_out = old_response(plates)
+    new_out_size = sum(len(b) for b in new_response(plates))
+    old_encode = time_call(lambda: old_response(plates), args.repeats)
+    new_encode = time_call(lambda: new_response(plates), args.repeats)
+    print(f"response (3 plates): base64 JSON {len(old_out)} B, {old_encode:.2f} ms | "
+          f"binary {new_out_size} B, {new_encode:.2f} ms")
+
+    for name, raw in frames:
+        json_body = json.dumps({"image": "data:image/jpeg;base64," + base64.b64encode(raw).decode('utf-8')})
+        old_decode = time_call(lambda: old_request(json_body), args.repeats)
+        new_decode = time_call(lambda: new_request(raw), args.repeats)
+        print(f"request {name}: base64 JSON {len(json_body)} B, {old_decode:.2f} ms | "
+              f"binary {len(raw)} B, {new_decode:.2f} ms "
+              f"({1 - len(raw) / len(json_body):.0%} smaller, {old_decode / new_decode:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
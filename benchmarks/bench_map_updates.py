@@ -0,0 +1,71 @@
+"""
+Cost of a single-cell map edit against a full PathFinder rebuild.
+
+On a garage-like lot (see bench_path_finder), blocks and reopens random cells
+with PathFinder.set_cell_type, which repairs distances around the cell and
+updates the free-spot allocator in place. A full rebuild
+(_calculate_distances + _update_blank_positions) is timed for comparison.
+The last column closes a lane: a --lane cells long wall built one cell at a
+time, where each cell reroutes everything behind the wall. Edits that would
+touch more than PathFinder.incremental_limit cells fall back to a rebuild.
+
+Usage:
+    python -m benchmarks.bench_map_updates [--sizes 500 2000] [--edits 200]
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+
+import numpy as np
+
+from benchmarks.bench_path_finder import garage_config
+from path_finders import PathFinder
+from path_finders.base_path_finder import EMPTY, OBSTACLE, PATH_ONLY, bfs_distances
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument('--lane', type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'rebuild ms':>11} {'edit median ms':>15} {'edit p99 ms':>12} "
+          f"{'lane worst ms':>14} {'distances ok':>13}")
+    for side in args.sizes:
+        pf = PathFinder(garage_config(side))
+        rng = random.Random(0)
+
+        start = time.perf_counter()
+        pf._calculate_distances()
+        pf._update_blank_positions()
+        rebuild_ms = (time.perf_counter() - start) * 1000
+
+        timings = []
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(args.edits):
+                position = (rng.randrange(side), rng.randrange(side))
+                original = int(pf.status_matrix[position])
+                if original not in (EMPTY, PATH_ONLY):
+                    continue
+                for status in (OBSTACLE, original):  # Block, then reopen
+                    start = time.perf_counter()
+                    pf.set_cell_type(position, status)
+                    timings.append((time.perf_counter() - start) * 1000)
+
+            # Wall along y = side // 2 from the entrance side of the lot
+            wall = []
+            for x in range(min(args.lane, side - 1)):
+                start = time.perf_counter()
+                pf.set_cell_type((x, side // 2), OBSTACLE)
+                wall.append((time.perf_counter() - start) * 1000)
+
+        ok = (bfs_distances(pf.status_matrix != OBSTACLE, [pf.initial_pos]) == pf.distance_matrix).all()
+        print(f"{side}x{side:<5} {rebuild_ms:>11.1f} {np.median(timings):>15.3f} "
+              f"{np.percentile(timings, 99):>12.3f} {max(wall):>14.1f} {str(ok):>13}")
+
+
+if __name__ == "__main__":
+    main()
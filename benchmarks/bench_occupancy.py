@@ -0,0 +1,97 @@
+"""
+Occupancy polling: live counters vs scanning the grids on every call.
+
+Builds a --size lot with --zones zone rectangles, parks --occupancy of its
+spots and times one /status poll computed three ways:
+
+    counters   PathFinder.get_occupancy (O(1) counters)
+    numpy      the full vectorized scan check_counters compares against
+    loops      the original nested-loop scan of get_parking_status (no zones
+               or bands), limited to --loop-polls polls
+
+It also reports park/unpark throughput with the counters maintained, and
+checks them against the full scan afterwards.
+
+Usage:
+    python -m benchmarks.bench_occupancy [--size 1000] [--zones 16]
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+
+from benchmarks.bench_path_finder import garage_config
+from path_finders import PathFinder
+from path_finders.base_path_finder import EMPTY, PARKED, UNREACHABLE
+
+
+def loop_scan(pf):
+    """The original get_parking_status cell loop"""
+    counts = [0, 0, 0, 0]
+    for x in range(pf.map_size[0]):
+        for y in range(pf.map_size[1]):
+            if pf.distance_matrix[x][y] != UNREACHABLE:
+                counts[pf.status_matrix[x][y]] += 1
+    return counts
+
+
+def per_poll_ms(call, polls):
+    start = time.perf_counter()
+    for _ in range(polls):
+        call()
+    return (time.perf_counter() - start) / polls * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--zones', type=int, default=16)
+    parser.add_argument('--occupancy', type=float, default=0.5)
+    parser.add_argument('--polls', type=int, default=200)
+    parser.add_argument('--loop-polls', type=int, default=1)
+    parser.add_argument('--ops', type=int, default=200_000)
+    args = parser.parse_args()
+
+    config = garage_config(args.size)
+    # A grid of equal zone rectangles
+    side = max(1, int(args.zones ** 0.5))
+    step = -(-args.size // side)
+    config.zones = {f"zone-{i}-{j}": (i * step, j * step, (i + 1) * step - 1, (j + 1) * step - 1)
+                    for i in range(side) for j in range(side)}
+    pf = PathFinder(config)
+    rng = random.Random(0)
+
+    # PathFinder prints a line per park/unpark
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        parked = [pf.allocate_spot() for _ in range(int(pf.free_spots * args.occupancy))]
+        start = time.perf_counter()
+        for _ in range(args.ops):
+            if rng.random() < 0.5:
+                i = rng.randrange(len(parked))
+                parked[i], parked[-1] = parked[-1], parked[i]
+                pf.remove_parked_position(parked.pop())
+            else:
+                position = pf.allocate_spot()
+                if position is not None:
+                    parked.append(position)
+        churn = args.ops / (time.perf_counter() - start)
+
+    status = pf.get_occupancy()
+    print(f"{args.size}x{args.size} lot, {len(config.zones)} zones, {len(status['distance_bands'])} distance bands, "
+          f"{status['parked_spots']}/{status['total_parkable_spots']} parked")
+    print(f"  park/unpark with counters: {churn:,.0f} ops/s")
+    print(f"  counters: {per_poll_ms(pf.get_occupancy, args.polls):10.4f} ms per poll")
+    print(f"  numpy:    {per_poll_ms(pf._scan_counts, max(1, args.polls // 20)):10.4f} ms per poll")
+    print(f"  loops:    {per_poll_ms(lambda: loop_scan(pf), args.loop_polls):10.1f} ms per poll")
+
+    errors = pf.check_counters()
+    counts = loop_scan(pf)
+    consistent = not errors and counts[EMPTY] == status['empty_spots'] and counts[PARKED] == status['parked_spots']
+    print(f"  counters match the full scan: {consistent}")
+    for error in errors:
+        print(f"    {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Per-frame OCR latency against the number of plates in the frame.
+
+Compares the old one-ONNX-call-per-crop loop with the batched
+Number_Plate_Recognizer.read_plates path.
+
+Usage:
+    python -m benchmarks.bench_ocr_batch --max-plates 16 --repeats 20
+"""
+import argparse
+import time
+
+import numpy as np
+
+from config import Config
+from model import Number_Plate_Recognizer
+
+
+def per_crop_ocr(model, plate_images):
+    texts = []
+    for plate_image in plate_images:
+        texts.extend(model.reader.run(model.ocr_preprocessing(plate_image)))
+    return texts
+
+
+def time_call(fn, repeats):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-plates', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    config = Config()
+    config.ocr_cache_size = 0  # Repeated crops would otherwise be served from the OCR cache
+    model = Number_Plate_Recognizer(config)
+    rng = np.random.default_rng(0)
+
+    print(f"{'plates':>6} {'per-crop ms':>12} {'batched ms':>11} {'speedup':>8}")
+    for num_plates in range(1, args.max_plates + 1):
+        crops = [rng.integers(0, 255, (40, 120, 3), dtype=np.uint8) for _ in range(num_plates)]
+        looped = time_call(lambda: per_crop_ocr(model, crops), args.repeats)
+        batched = time_call(lambda: model.read_plates(crops), args.repeats)
+        print(f"{num_plates:>6} {looped:>12.2f} {batched:>11.2f} {looped / batched:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
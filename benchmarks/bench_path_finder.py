@@ -0,0 +1,96 @@
+"""
+PathFinder construction time and grid memory against the lot size.
+
+Builds a garage-like layout (a road every third row, a few pillars) and times
+PathFinder(config) - grids, BFS distances and the free-spot index - and the BFS
+alone (bfs s), next to the old nested-list, tuple-per-cell BFS it replaced. The
+old version is only run up to --legacy-max cells per side; at 2000x2000 it needs
+minutes and gigabytes.
+
+Usage:
+    python -m benchmarks.bench_path_finder [--sizes 40 500 2000] [--legacy-max 500]
+"""
+import argparse
+import sys
+import time
+from collections import deque
+
+from path_finders import PathFinder
+from path_finders.base_path_finder import OBSTACLE, PathFinderConfig, bfs_distances
+
+
+def garage_config(side):
+    """Square lot with the entrance in a corner, a road every third row and a pillar every 10 cells"""
+    paths = [(x, y) for y in range(1, side, 3) for x in range(side)]
+    paths += [(0, y) for y in range(side)]
+    obstacles = [(x, y) for y in range(2, side, 3) for x in range(5, side, 10)]
+    return PathFinderConfig(map_size=(side, side), initial_pos=(0, 0), obstacles=obstacles, paths=paths)
+
+
+def legacy_build(config):
+    """The previous PathFinder.__init__: nested lists and a tuple-per-cell BFS"""
+    width, height = config.map_size
+    distance_matrix = [[float('inf') for _ in range(height)] for _ in range(width)]
+    status_matrix = [[0 for _ in range(height)] for _ in range(width)]
+    for x, y in config.obstacles:
+        status_matrix[x][y] = 2
+    for x, y in config.paths:
+        status_matrix[x][y] = 3
+
+    queue = deque([(config.initial_pos[0], config.initial_pos[1], 0)])
+    visited = [[False for _ in range(height)] for _ in range(width)]
+    while queue:
+        x, y, dist = queue.popleft()
+        if not (0 <= x < width and 0 <= y < height) or visited[x][y] or status_matrix[x][y] == 2:
+            continue
+        visited[x][y] = True
+        distance_matrix[x][y] = dist
+        for dx, dy in ((-1, 0), (0, -1), (0, 1), (1, 0)):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and not visited[nx][ny] and status_matrix[nx][ny] != 2:
+                queue.append((nx, ny, dist + 1))
+    return distance_matrix, status_matrix, visited
+
+
+def nested_list_bytes(rows):
+    """Outer list + row lists + one object per distinct cell value (ints below 257 are cached)"""
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row)
+        total += sum(sys.getsizeof(v) for v in row if not (isinstance(v, (int, bool)) and -5 <= v <= 256))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[40, 500, 2000])
+    parser.add_argument('--legacy-max', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'numpy s':>9} {'bfs s':>7} {'numpy MB':>9} {'legacy s':>9} {'legacy MB':>10} {'dist match':>11}")
+    for side in args.sizes:
+        config = garage_config(side)
+
+        start = time.perf_counter()
+        pf = PathFinder(config)
+        numpy_s = time.perf_counter() - start
+        numpy_mb = (pf.distance_matrix.nbytes + pf.status_matrix.nbytes) / 1e6
+        start = time.perf_counter()
+        bfs_distances(pf.status_matrix != OBSTACLE, [pf.initial_pos])
+        bfs_s = time.perf_counter() - start
+
+        legacy = f"{'-':>9} {'-':>10} {'-':>11}"
+        if side <= args.legacy_max:
+            start = time.perf_counter()
+            distances, status, visited = legacy_build(config)
+            legacy_s = time.perf_counter() - start
+            legacy_mb = sum(nested_list_bytes(m) for m in (distances, status, visited)) / 1e6
+            same = all(pf.distance_matrix[x, y] == (-1 if d == float('inf') else d)
+                       for x, row in enumerate(distances) for y, d in enumerate(row))
+            legacy = f"{legacy_s:>9.3f} {legacy_mb:>10.1f} {str(same):>11}"
+
+        print(f"{side}x{side:<5} {numpy_s:>9.3f} {bfs_s:>7.3f} {numpy_mb:>9.1f} {legacy}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Park/unpark churn on a PathFinder lot: throughput and memory of the spot index.
+
+Fills the lot to --occupancy, then runs --ops random operations: park a vehicle
+at the closest free spot, or unpark a random parked one (50/50). The same
+sequence is replayed on the old scheme, a heapq of (distance, [x, y]) with
+stale entries, duplicate pushes on unpark and parked_list.remove. That scheme
+is limited to --legacy-ops because the remove scans the whole list.
+
+Usage:
+    python -m benchmarks.bench_spot_allocator [--size 500] [--ops 2000000]
+"""
+import argparse
+import contextlib
+import heapq
+import os
+import random
+import time
+
+from benchmarks.bench_path_finder import garage_config
+from path_finders import PathFinder
+from path_finders.base_path_finder import EMPTY, PARKED
+
+
+class LegacyLot:
+    """The previous bookkeeping, minus printing"""
+
+    def __init__(self, pf):
+        self.status = pf.status_matrix.copy()
+        self.distance = pf.distance_matrix
+        self.parked_list = []
+        self.heap = []
+        spots = pf.entrance_spots[0]
+        for x, y in sorted(spots._position(k) for k in spots._heap):
+            heapq.heappush(self.heap, (int(self.distance[x, y]), [x, y]))
+
+    def park_closest(self):
+        while self.heap:
+            _, (x, y) = heapq.heappop(self.heap)
+            if self.status[x, y] == EMPTY:
+                self.status[x, y] = PARKED
+                self.parked_list.append((x, y))
+                return (x, y)
+        return None
+
+    def unpark(self, position):
+        x, y = position
+        self.status[x, y] = EMPTY
+        self.parked_list.remove(position)
+        heapq.heappush(self.heap, (int(self.distance[x, y]), [x, y]))
+
+
+def run(lot_park, lot_unpark, ops, rng, parked):
+    """Random churn; parked is a list used for O(1) random picks"""
+    start = time.perf_counter()
+    for _ in range(ops):
+        if parked and rng.random() < 0.5:
+            i = rng.randrange(len(parked))
+            parked[i], parked[-1] = parked[-1], parked[i]
+            lot_unpark(parked.pop())
+        else:
+            position = lot_park()
+            if position is not None:
+                parked.append(position)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=500)
+    parser.add_argument('--occupancy', type=float, default=0.5)
+    parser.add_argument('--ops', type=int, default=2_000_000)
+    parser.add_argument('--legacy-ops', type=int, default=100_000)
+    args = parser.parse_args()
+
+    pf = PathFinder(garage_config(args.size))
+    legacy = LegacyLot(pf)
+    free = pf.free_spots
+    fill = int(free * args.occupancy)
+    print(f"{args.size}x{args.size} lot, {free} free spots, pre-filled to {fill}")
+
+    # New allocator: find + park is what /find_shortest_parking_lot does
+    def park_closest():
+        position = pf.find_shortest_blank_position()
+        if position is not None:
+            pf.park_vehicle(position)
+        return position
+
+    # PathFinder prints a line per park/unpark
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        parked = [park_closest() for _ in range(fill)]
+        seconds = run(park_closest, pf.remove_parked_position, args.ops, random.Random(0), parked)
+    print(f"allocator: {args.ops / seconds:>10,.0f} ops/s  index size {pf.free_spots:>8}")
+
+    parked = [legacy.park_closest() for _ in range(fill)]
+    seconds = run(legacy.park_closest, legacy.unpark, args.legacy_ops, random.Random(0), parked)
+    actually_free = len({(x, y) for _, (x, y) in legacy.heap if legacy.status[x, y] == EMPTY})
+    print(f"legacy:    {args.legacy_ops / seconds:>10,.0f} ops/s  heap size  {len(legacy.heap):>8} "
+          f"(free {actually_free}, after {args.legacy_ops} ops)")
+
+
+if __name__ == "__main__":
+    main()
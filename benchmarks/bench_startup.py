@@ -0,0 +1,58 @@
+"""
+Cold-start timeline of the API, each run in a fresh interpreter.
+
+Reports, per run:
+    import   - `import main` (should stay small: no models are built at import)
+    serving  - app startup until the server accepts requests (lifespan entered)
+    ready    - until /health returns 200 (models loaded and warmed up)
+    first    - latency of the first /predict/binary/ request once ready
+
+Usage:
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = r'''
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+import cv2, numpy as np
+from starlette.testclient import TestClient
+frame = cv2.imencode('.jpg', np.zeros((720, 1280, 3), np.uint8))[1].tobytes()
+with TestClient(main.app) as client:
+    serving = time.perf_counter()
+    while client.get("/health").status_code != 200:
+        if main.inference_status["state"] == "error":
+            raise SystemExit(main.inference_status["error"])
+        time.sleep(0.01)
+    ready = time.perf_counter()
+    client.post("/predict/binary/", content=frame, headers={"Accept": "application/json"})
+    first = time.perf_counter() - ready
+print(json.dumps({"import": imported - start, "serving": serving - start,
+                  "ready": ready - start, "first": first}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, '-c', CHILD], capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    for key in ('import', 'serving', 'ready', 'first'):
+        values = [run[key] for run in runs]
+        print(f"{key:>8}: median {statistics.median(values) * 1000:9.1f} ms  "
+              f"(min {min(values) * 1000:.1f}, max {max(values) * 1000:.1f})")
+
+
+if __name__ == "__main__":
+    main()
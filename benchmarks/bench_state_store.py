@@ -0,0 +1,86 @@
+"""
+Lot state persistence: per-operation logging cost and restart time.
+
+Runs --ops park/unpark operations (50/50, closest free spot) on a lot with
+no store and with a LotStateStore in each sync mode. It then simulates a
+crash, leaving the log tail unsnapshotted, and times a restart: building the
+PathFinder again with recovery, against building it without a store.
+
+Usage:
+    python -m benchmarks.bench_state_store [--sizes 500 2000] [--ops 200000]
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_path_finder import garage_config
+from path_finders import LotStateStore, PathFinder
+from path_finders.state_store import SYNC_MODES
+
+
+def churn(pf, ops, rng):
+    parked = []
+    start = time.perf_counter()
+    for _ in range(ops):
+        if parked and rng.random() < 0.5:
+            i = rng.randrange(len(parked))
+            parked[i], parked[-1] = parked[-1], parked[i]
+            pf.remove_parked_position(parked.pop())
+        else:
+            position = pf.allocate_spot()
+            if position is not None:
+                parked.append(position)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000])
+    parser.add_argument('--ops', type=int, default=200_000)
+    parser.add_argument('--fsync-ops', type=int, default=5_000)
+    parser.add_argument('--snapshot-interval', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        config = garage_config(size)
+        print(f"{size}x{size} lot")
+        directory = tempfile.mkdtemp(prefix='lot-state-')
+        try:
+            # PathFinder prints a line per park/unpark
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                pf = PathFinder(config)
+                cold = time.perf_counter() - start
+                base = args.ops / churn(pf, args.ops, random.Random(0))
+            print(f"  {'no store':>10} {base:>10,.0f} ops/s")
+
+            for sync in SYNC_MODES:
+                ops = args.fsync_ops if sync == 'always' else args.ops
+                shutil.rmtree(directory)
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    store = LotStateStore(directory, sync=sync, snapshot_interval=args.snapshot_interval)
+                    pf = PathFinder(config, store=store)
+                    rate = ops / churn(pf, ops, random.Random(0))
+                print(f"  {sync:>10} {rate:>10,.0f} ops/s  "
+                      f"({(1 / rate - 1 / base) * 1e6:+.1f} us/op over no store)")
+
+            # The 'none' run above left its log unflushed; flush it as the OS would
+            # after a process crash, then restart without close()
+            store._log.flush()
+            tail = store.records_since_snapshot
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                PathFinder(config, store=LotStateStore(directory))
+                warm = time.perf_counter() - start
+            print(f"  restart: {warm * 1e3:,.0f} ms with recovery of a {tail}-record log tail, "
+                  f"{cold * 1e3:,.0f} ms from config alone")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
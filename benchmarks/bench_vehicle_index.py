@@ -0,0 +1,87 @@
+"""
+"Where is my car": VehicleIndex lookups vs querying the history table, plus startup rebuild time.
+
+Fills a throwaway SQLite history table with --rows rows over --plates
+plates (bench_history_queries.fill) and a lot whose spots are all parked;
+fill() reuses 40 positions, so most plates lose their spot to a later one.
+Then it times:
+
+    rebuild   crud.latest_histories + LotRegistry.restore_vehicles, as at startup
+    index     VehicleIndex.spot_of per lookup
+    history   newest history row of the plate per lookup (crud.query_histories, limit 1)
+
+Usage:
+    python -m benchmarks.bench_vehicle_index [--rows 1000000] [--plates 50000]
+"""
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from benchmarks.bench_history_queries import fill
+from models import History
+from path_finders import LotRegistry, PathFinderConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--plates', type=int, default=50_000)
+    parser.add_argument('--lookups', type=int, default=2_000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.db')
+        fill(path, args.rows, args.plates)
+        engine = create_engine(f"sqlite:///{path}")
+        # fill() creates the table without lot_id or indexes
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE history ADD COLUMN lot_id VARCHAR")
+            for index in History.__table__.indexes:
+                index.create(connection)
+        Session = sessionmaker(bind=engine)
+
+        # One lot large enough for every position bench_history_queries writes, all parked
+        config = PathFinderConfig(map_size=(40, 40), initial_pos=(0, 0))
+        registry = LotRegistry(config)
+        lot = registry.get()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for x in range(40):
+                for y in range(40):
+                    lot.path_finder.park_vehicle((x, y))
+
+        start = time.perf_counter()
+        with Session() as db:
+            latest = {history.number_plate: history for history in crud.latest_histories(db)}
+        events = [(plate, None, tuple(map(int, history.position.split(','))))
+                  for plate, history in latest.items() if history.status == 'Parked']
+        count = registry.restore_vehicles(events)
+        print(f"{args.rows:,} rows, {len(latest):,} plates: rebuild {time.perf_counter() - start:.2f}s, "
+              f"{count} plates indexed")
+
+        plates = [f"P{rng.randrange(args.plates):06d}" for _ in range(args.lookups)]
+        start = time.perf_counter()
+        for plate in plates:
+            registry.vehicles.spot_of(plate)
+        index_seconds = (time.perf_counter() - start) / args.lookups
+
+        with Session() as db:
+            start = time.perf_counter()
+            for plate in plates:
+                crud.query_histories(db, number_plate=plate, limit=1)
+                db.expunge_all()
+            history_seconds = (time.perf_counter() - start) / args.lookups
+        print(f"  index:   {index_seconds * 1e6:8.2f} us per lookup")
+        print(f"  history: {history_seconds * 1e6:8.2f} us per lookup")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,89 @@
+from sqlalchemy import func, or_, select, tuple_
 from sqlalchemy.orm import Session
 from models import History
 from datetime import datetime  # You need this
+from typing import List, Optional, Tuple
 
 def get_user(db: Session, id: int):
     return db.query(History).filter(History.id == id).first()
 
-def create_history(db: Session, number_plate: str, position: str, status: str, time: datetime):
+def create_history(db: Session, number_plate: str, position: str, status: str, time: datetime,
+                   lot_id: Optional[str] = None):
     history = History(
         number_plate=number_plate,
         position=position,
         status=status,
-        time=time
+        time=time,
+        lot_id=lot_id
     )
     db.add(history)
     db.commit()
     db.refresh(history)
     return history
+
+def create_histories(db: Session, rows: List[dict]):
+    """Insert several history rows in one transaction; all or none are stored"""
+    histories = [History(**row) for row in rows]
+    db.add_all(histories)
+    db.commit()
+    for history in histories:
+        db.refresh(history)
+    return histories
+
+def query_histories(db: Session, number_plate: Optional[str] = None, status: Optional[str] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    after: Optional[Tuple[datetime, int]] = None, limit: int = 100,
+                    descending: bool = True, lot_id: Optional[str] = None, include_null_lot: bool = False):
+    """
+    One page of history rows ordered by (time, id), newest first unless descending is False
+
+    start is inclusive and end exclusive. after is the (time, id) of the last row
+    of the previous page (keyset pagination), so every page costs the same
+    index range scan however deep it is. With include_null_lot, rows stored
+    without a lot_id (the default lot's) also match lot_id.
+    """
+    query = select(History)
+    if number_plate is not None:
+        query = query.where(History.number_plate == number_plate)
+    if status is not None:
+        query = query.where(History.status == status)
+    if lot_id is not None:
+        query = query.where(or_(History.lot_id == lot_id, History.lot_id.is_(None)) if include_null_lot
+                            else History.lot_id == lot_id)
+    if start is not None:
+        query = query.where(History.time >= start)
+    if end is not None:
+        query = query.where(History.time < end)
+    key = tuple_(History.time, History.id)
+    if after is not None:
+        query = query.where(key < tuple_(*after) if descending else key > tuple_(*after))
+    if descending:
+        query = query.order_by(History.time.desc(), History.id.desc())
+    else:
+        query = query.order_by(History.time, History.id)
+    return db.scalars(query.limit(limit)).all()
+
+
+def iter_histories(db: Session, batch_size: int = 5000, **filters):
+    """Every history row matching the query_histories filters, fetched one keyset page at a time"""
+    after = None
+    while True:
+        page = query_histories(db, after=after, limit=batch_size, **filters)
+        yield from page
+        if len(page) < batch_size:
+            return
+        after = (page[-1].time, page[-1].id)
+        # Yielded rows stay readable; the session just stops tracking them
+        db.expunge_all()
+
+
+def latest_histories(db: Session):
+    """The newest history row of every plate, oldest first (one pass over the plate index)"""
+    latest = (select(History.number_plate, func.max(History.time).label('time'))
+              .where(History.number_plate.is_not(None))
+              .group_by(History.number_plate)
+              .subquery())
+    query = (select(History)
+             .join(latest, (History.number_plate == latest.c.number_plate) & (History.time == latest.c.time))
+             .order_by(History.time, History.id))
+    return db.scalars(query).all()
@@ -1,11 +1,64 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./test.db"  # Use ./ to save in current directory
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def build_engine(config):
+    """
+    Create the SQLAlchemy engine for config.database_url
+
+    SQLite files get WAL journaling plus the sqlite_* pragmas on every new
+    connection, so readers no longer wait for writers; other URLs
+    (PostgreSQL, MySQL, ...) get the db_pool_* connection pool settings.
+    """
+    url = make_url(config.database_url)
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(url,
+                             pool_size=config.db_pool_size,
+                             max_overflow=config.db_max_overflow,
+                             pool_timeout=config.db_pool_timeout,
+                             pool_recycle=config.db_pool_recycle,
+                             pool_pre_ping=config.db_pool_pre_ping)
+
+    in_memory = url.database in (None, '', ':memory:')
+    pool_args = {} if in_memory else {'pool_size': config.db_pool_size,
+                                      'max_overflow': config.db_max_overflow,
+                                      'pool_timeout': config.db_pool_timeout}
+    engine = create_engine(url, connect_args={"check_same_thread": False,
+                                              "timeout": config.sqlite_busy_timeout_ms / 1000.0},
+                           **pool_args)
+
+    pragmas = [
+        f"PRAGMA journal_mode={config.sqlite_journal_mode}",
+        f"PRAGMA synchronous={config.sqlite_synchronous}",
+        f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}",
+        f"PRAGMA cache_size={int(config.sqlite_cache_size)}",
+        f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+# Bound by init_database, which main.py calls with the application's Config
+# at startup; sessions must not be created before that
+engine = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
+
+
+def init_database(config):
+    """Build the engine from config (see build_engine) and bind SessionLocal to it"""
+    global engine
+    if engine is not None:
+        engine.dispose()
+    engine = build_engine(config)
+    SessionLocal.configure(bind=engine)
+    return engine
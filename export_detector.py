@@ -0,0 +1,99 @@
+"""
+Export the YOLO plate detector to ONNX and build an INT8-quantized copy.
+
+The float model is written to Config.onnx_weights_file and the quantized one to
+Config.onnx_int8_weights_file; select them at runtime with
+Config.detector_backend = 'onnx' or 'onnx-int8'.
+
+Usage:
+    python export_detector.py --calibration-dir path/to/gate/images [--num-calibration 200]
+"""
+import argparse
+import os
+import shutil
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import Config
+from utils.preprocessing import letterbox
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def list_images(directory: str, limit: int):
+    paths = sorted(p for p in Path(directory).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return [str(p) for p in paths[:limit]]
+
+
+def load_detector_input(path: str, img_size: int) -> np.ndarray:
+    """Letterbox a local image exactly like Number_Plate_Recognizer.detect_batch does"""
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    padded, _, _ = letterbox(image, img_size)
+    return np.ascontiguousarray(padded[..., ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def export_onnx(config: Config) -> str:
+    from ultralytics import YOLO
+    exported = YOLO(config.yolo_weights_file).export(format='onnx', imgsz=config.img_size,
+                                                     dynamic=True, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(config.onnx_weights_file):
+        shutil.move(exported, config.onnx_weights_file)
+    return config.onnx_weights_file
+
+
+def quantize_int8(config: Config, calibration_images):
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class LocalImageReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.paths = iter(calibration_images)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            return {self.input_name: load_detector_input(path, config.img_size)}
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(config.onnx_weights_file,
+                                      providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    preprocessed = config.onnx_weights_file.replace('.onnx', '-preprocessed.onnx')
+    quant_pre_process(config.onnx_weights_file, preprocessed)
+    try:
+        quantize_static(preprocessed, config.onnx_int8_weights_file, LocalImageReader(input_name),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(preprocessed)
+    return config.onnx_int8_weights_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calibration-dir', required=True,
+                        help="Directory of representative local images used to calibrate INT8 ranges")
+    parser.add_argument('--num-calibration', type=int, default=200)
+    parser.add_argument('--skip-export', action='store_true',
+                        help="Reuse an existing Config.onnx_weights_file and only quantize")
+    parser.add_argument('--config', default=None, help="Optional JSON/Python config file")
+    args = parser.parse_args()
+
+    config = Config(args.config)
+    calibration_images = list_images(args.calibration_dir, args.num_calibration)
+    if not calibration_images:
+        raise SystemExit(f"No images found in {args.calibration_dir}")
+
+    if not args.skip_export:
+        print(f"ONNX model written to {export_onnx(config)}")
+    print(f"Calibrating on {len(calibration_images)} images")
+    print(f"INT8 model written to {quantize_int8(config, calibration_images)}")
+
+
+if __name__ == "__main__":
+    main()
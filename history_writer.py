@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+from typing import List
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from models import History
+
+
+class HistoryWriter():
+    """
+    Write-behind queue for History rows.
+
+    Handlers submit rows and return immediately; a background thread collects
+    them until config.history_batch_size rows are waiting or the oldest has
+    waited config.history_flush_interval_ms, then writes the batch as one
+    multi-row INSERT in a single transaction. Rows submitted together
+    (submit_many) are always written in the same transaction.
+
+    The queue holds at most config.history_queue_size submissions; beyond that
+    submit blocks until the writer catches up, so bursts slow down instead of
+    losing rows. stop() writes everything still queued before returning.
+    When a batch fails, its submissions are written one transaction each:
+    a submission the database rejects (e.g. a value it cannot bind) is logged
+    and dropped, and one that fails on a locked or unreachable database is
+    retried until it succeeds or the writer stops.
+    """
+    def __init__(self, session_factory, config):
+        self.session_factory = session_factory
+        self.batch_size = max(1, config.history_batch_size)
+        self.flush_interval = config.history_flush_interval_ms / 1000.0
+        self.retry_interval = 1.0
+
+        self._queue = queue.Queue(maxsize=config.history_queue_size)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._started = time.monotonic()
+        self._rows_submitted = 0
+        self._rows_written = 0
+        self._batches_written = 0
+        self._write_seconds = 0.0
+        self._write_errors = 0
+        self._rows_dropped = 0
+        self._blocked_submits = 0
+        self._max_queue_depth = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Write all queued rows, then stop the writer thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, row: dict):
+        """Queue one History row (number_plate, position, status, time)"""
+        self.submit_many([row])
+
+    def submit_many(self, rows: List[dict]):
+        """Queue rows that must be written in one transaction"""
+        if not rows:
+            return
+        item = (time.monotonic(), list(rows))
+        with self._stats_lock:
+            self._rows_submitted += len(rows)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self._blocked_submits += 1
+            self._queue.put(item)
+        with self._stats_lock:
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+
+    def flush(self):
+        """Block until every row submitted so far is written"""
+        self._queue.join()
+
+    def _collect_batch(self, wait: bool = True):
+        try:
+            first = self._queue.get(timeout=0.1) if wait else self._queue.get_nowait()
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        rows = len(first[1])
+        deadline = first[0] + self.flush_interval
+        while rows < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if wait and remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write_batch(batch)
+        # Shutdown: drain without waiting for batches to fill
+        while True:
+            batch = self._collect_batch(wait=False)
+            if not batch:
+                break
+            self._write_batch(batch, retry=False)
+
+    def _insert(self, rows: List[dict]):
+        db = self.session_factory()
+        try:
+            db.execute(insert(History), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Errors worth retrying: a locked or unreachable database, not a row it cannot store"""
+        return isinstance(error, OperationalError) or (isinstance(error, DBAPIError) and error.connection_invalidated)
+
+    def _write_batch(self, batch, retry: bool = True):
+        rows = [row for _, item_rows in batch for row in item_rows]
+        start = time.monotonic()
+        try:
+            self._insert(rows)
+        except Exception as e:
+            with self._stats_lock:
+                self._write_errors += 1
+            # Fall back to one transaction per submission, so a bad row only costs its own
+            # submission and the rows queued behind it still get written
+            print(f"Warning: writing {len(rows)} history rows failed, writing them one by one: {e}")
+            for item in batch:
+                self._write_item(item, retry)
+                self._queue.task_done()
+            return
+        self._record_written(batch, len(rows), time.monotonic() - start)
+        for _ in batch:
+            self._queue.task_done()
+
+    def _write_item(self, item, retry: bool):
+        rows = item[1]
+        while True:
+            start = time.monotonic()
+            try:
+                self._insert(rows)
+                self._record_written([item], len(rows), time.monotonic() - start)
+                return
+            except Exception as e:
+                with self._stats_lock:
+                    self._write_errors += 1
+                if not retry or not self._is_transient(e):
+                    print(f"Warning: dropped {len(rows)} history rows after a failed write: {e}")
+                    with self._stats_lock:
+                        self._rows_dropped += len(rows)
+                    return
+                print(f"Warning: writing {len(rows)} history rows failed, retrying: {e}")
+                # Once stopping, make one final attempt
+                retry = not self._stop_event.wait(self.retry_interval)
+
+    def _record_written(self, batch, rows: int, seconds: float):
+        lag = time.monotonic() - batch[0][0]
+        with self._stats_lock:
+            self._rows_written += rows
+            self._batches_written += 1
+            self._write_seconds += seconds
+            self._last_lag = lag
+            self._max_lag = max(self._max_lag, lag)
+
+    def get_stats(self) -> dict:
+        """Throughput, batch sizes and queue lag since startup"""
+        with self._stats_lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'max_queue_depth': self._max_queue_depth,
+                'blocked_submits': self._blocked_submits,
+                'rows_submitted': self._rows_submitted,
+                'rows_written': self._rows_written,
+                'rows_pending': self._rows_submitted - self._rows_written - self._rows_dropped,
+                'rows_dropped': self._rows_dropped,
+                'batches_written': self._batches_written,
+                'write_errors': self._write_errors,
+                'mean_batch_size': (self._rows_written / self._batches_written
+                                    if self._batches_written else 0),
+                'rows_per_second': self._rows_written / elapsed if elapsed > 0 else 0,
+                'write_rows_per_second': (self._rows_written / self._write_seconds
+                                          if self._write_seconds > 0 else 0),
+                'last_lag_ms': self._last_lag * 1000.0,
+                'max_lag_ms': self._max_lag * 1000.0,
+            }
@@ -1,27 +1,38 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, WebSocket, WebSocketDisconnect, Request
 from sqlalchemy.orm import Session
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import joblib
-import numpy as np
+from contextlib import asynccontextmanager
 from config import Config
-from model import Number_Plate_Recognizer
-from path_finders import PathFinder
+from model import (Number_Plate_Recognizer, InferenceScheduler, InferenceQueueFull, FrameTooLarge,
+                   ProcessInferencePool, StreamRecognizer)
+from path_finders import LotRegistry, VehicleAlreadyParked, normalize_plate
+from path_finders.base_path_finder import EMPTY, OBSTACLE, PATH_ONLY
+from utils.preprocessing import decode_image
 import cv2
-import io
-from PIL import Image
 import base64
+import csv
+import io
 import json
+import re
 from typing import List, Optional
 import os
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from database import SessionLocal, engine
-from models import History
+from database import SessionLocal, init_database
+from models import History, migrate_history_table
 from database import Base
 import crud
+from history_writer import HistoryWriter
 import datetime
-Base.metadata.create_all(bind=engine)
+import asyncio
+import threading
+import time
+try:
+    import msgpack
+except ImportError:  # Optional: only needed for msgpack responses from /predict/binary/
+    msgpack = None
 
 def get_db():
     db = SessionLocal()
@@ -48,11 +59,82 @@ class PredictionResponse(BaseModel):
 class Position(BaseModel):
     position: tuple[int, int]
 
+# Initialize config; models, path finder and tables are created in the lifespan hook
+config = Config()
+model = None
+scheduler = None
+lots = None
+history_writer = None
+active_streams = 0  # Open /ws/stream connections
+inference_status = {"state": "loading", "load_seconds": None, "warmup_seconds": None, "error": None}
+
+
+def load_inference():
+    """Build the recognizer (or worker processes), warm it up and start serving inference"""
+    global model, scheduler
+    start = time.perf_counter()
+    try:
+        if config.inference_processes > 0:
+            # Each worker process loads and warms up its own model; frames reach them through shared memory
+            pool = ProcessInferencePool(config)
+            pool.start()
+            if not pool.wait_ready(config.model_load_timeout):
+                raise RuntimeError("Inference workers did not become ready in time")
+            inference_status["load_seconds"] = time.perf_counter() - start
+            scheduler = pool
+        else:
+            recognizer = Number_Plate_Recognizer(config)
+            inference_status["load_seconds"] = time.perf_counter() - start
+            warmup_start = time.perf_counter()
+            recognizer.warmup(config.warmup_frames)
+            inference_status["warmup_seconds"] = time.perf_counter() - warmup_start
+            model = recognizer
+            inference_scheduler = InferenceScheduler(recognizer, config)
+            inference_scheduler.start()
+            scheduler = inference_scheduler
+        inference_status["state"] = "ready"
+    except Exception as e:
+        inference_status["state"] = "error"
+        inference_status["error"] = str(e)
+
+
+def inference_ready() -> bool:
+    return inference_status["state"] == "ready"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global lots, history_writer
+    # Built here, from this app's Config instance, so a config file can change the database
+    engine = init_database(config)
+    Base.metadata.create_all(bind=engine)
+    migrate_history_table(engine)
+    lots = LotRegistry(config)
+    restore_vehicle_index()
+    if config.history_write_behind:
+        history_writer = HistoryWriter(SessionLocal, config)
+        history_writer.start()
+    if config.model_background_loading:
+        # Serve parking/history endpoints immediately; /health reports when inference is ready
+        threading.Thread(target=load_inference, name="model-loader", daemon=True).start()
+    else:
+        await run_in_threadpool(load_inference)
+    yield
+    if scheduler is not None:
+        scheduler.stop()
+    if history_writer is not None:
+        # Writes every queued history row before the process exits
+        history_writer.stop()
+    lots.close()
+    engine.dispose()
+
+
 # Create app
 app = FastAPI(
     title="Number Plate Recognition API",
     description="API for detecting and recognizing number plates using YOLO and OCR",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -61,70 +143,503 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Plate-Texts", "X-Num-Plates"],
 )
 
 
-# Initialize config and model
-config = Config()
-model = Number_Plate_Recognizer(config)
-path_finder = PathFinder(config)
+
+def load_frame(contents: bytes):
+    """
+    Decode encoded image bytes into a BGR frame, or None.
+    The recognizer letterboxes its own detector input, so the frame keeps its resolution
+    for plate crops; only very large JPEGs are decoded at reduced scale.
+    """
+    return decode_image(contents, min_size=tuple(config.frame_min_decode_size))
+
+
+def encode_result_images(result):
+    """Render annotated plates and JPEG-encode them (frames stay BGR end to end)"""
+    buffers = []
+    for img in result.render():
+        _, buffer = cv2.imencode('.jpg', img)
+        buffers.append(buffer)
+    return buffers
+
+
+async def recognize(image):
+    """Run inference on the scheduler's worker pool, mapping a full admission queue to 503"""
+    if not inference_ready():
+        raise HTTPException(status_code=503, detail=f"Model is not ready ({inference_status['state']})",
+                            headers={"Retry-After": str(config.inference_retry_after)})
+    try:
+        return await scheduler.recognize(image)
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail="Inference queue is full, try again later",
+                            headers={"Retry-After": str(e.retry_after)})
+    except FrameTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
 # Serve static frontend files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+# Fields a /history row may set; time is filled in by the server
+HISTORY_FIELDS = {"number_plate", "position", "status", "lot_id"}
+
+# History statuses written when a vehicle arrives and leaves
+HISTORY_PARKED = "Parked"
+HISTORY_UNPARKED = "Unparked"
+
+# Column letters of the web UI's "B3" positions (column B, row 3)
+UI_COLUMN_LETTERS = "ABCDEFGHIJKLMNP"
+
+
+def format_position(position) -> str:
+    return f"{position[0]},{position[1]}"
+
+
+def parse_position(text: Optional[str]):
+    """(x, y) from a history position, either "x,y" or the UI's "<column letter><row>"; None if neither"""
+    match = re.fullmatch(r"\s*(\d+)\s*,\s*(\d+)\s*", text or "")
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = re.fullmatch(r"([A-Z])(\d+)", (text or "").strip().upper())
+    if match and match.group(1) in UI_COLUMN_LETTERS:
+        return int(match.group(2)), UI_COLUMN_LETTERS.index(match.group(1))
+    return None
+
+
+def restore_vehicle_index():
+    """Rebuild the plate -> spot index from the newest history row of every plate"""
+    db = SessionLocal()
+    try:
+        latest = {}
+        for history in crud.latest_histories(db):
+            # Rows come oldest first, so the last one wins; spellings of one plate
+            # ("51A-123.45" from a client, "51A12345" from the server) count as one
+            latest[normalize_plate(history.number_plate)] = history
+    finally:
+        db.close()
+    events = []
+    for history in sorted(latest.values(), key=lambda history: (history.time, history.id)):
+        position = parse_position(history.position)
+        if history.status == HISTORY_PARKED and position is not None:
+            events.append((history.number_plate, history.lot_id, position))
+    count = lots.restore_vehicles(events)
+    print(f"Vehicle index restored: {count} parked plates")
+
+
+def record_histories(db: Session, rows: List[dict]):
+    """Store history rows in one transaction, through the write-behind queue when enabled"""
+    if history_writer is not None:
+        history_writer.submit_many(rows)
+    else:
+        crud.create_histories(db, rows)
+
+
 @app.post("/history")
 def create_history(data: dict, db: Session = Depends(get_db)):
+    unknown = set(data) - HISTORY_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown history fields: {sorted(unknown)}")
+    # Checked here: with write-behind the row is only bound to SQL after the response
+    invalid = sorted(field for field, value in data.items() if value is not None and not isinstance(value, str))
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"History fields must be strings: {invalid}")
     data['time'] = datetime.datetime.now()
+    if history_writer is not None:
+        # Written in the next batch; the response does not wait for the commit
+        history_writer.submit(data)
+        return data
     return crud.create_history(db=db,**data)
 
 
+def history_to_dict(history: History) -> dict:
+    return {
+        "id": history.id,
+        "number_plate": history.number_plate,
+        "position": history.position,
+        "status": history.status,
+        "time": history.time.isoformat() if history.time else None,
+        "lot_id": history.lot_id or lots.default_lot_id  # Rows without one belong to the default lot
+    }
+
+
+def history_filters(number_plate: Optional[str], status: Optional[str], start: Optional[datetime.datetime],
+                    end: Optional[datetime.datetime], order: str, lot_id: Optional[str] = None) -> dict:
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    return {"number_plate": number_plate, "status": status, "start": start, "end": end,
+            "descending": order == "desc", "lot_id": lot_id,
+            "include_null_lot": lot_id is not None and lot_id == lots.default_lot_id}
+
+
+@app.get("/history")
+def list_history(number_plate: Optional[str] = None, status: Optional[str] = None,
+                 start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                 cursor: Optional[str] = None, limit: Optional[int] = None, order: str = "desc",
+                 lot_id: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    History rows filtered by plate, status, lot and time range [start, end), newest first by default
+    
+    Pages are keyed on (time, id): pass the returned next_cursor as cursor to get
+    the following page; next_cursor is null on the last page.
+    """
+    filters = history_filters(number_plate, status, start, end, order, lot_id)
+    limit = config.history_page_size if limit is None else limit
+    if not 0 < limit <= config.history_max_page_size:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {config.history_max_page_size}")
+    after = None
+    if cursor:
+        try:
+            time_text, id_text = cursor.rsplit("_", 1)
+            after = (datetime.datetime.fromisoformat(time_text), int(id_text))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor '{cursor}'")
+    
+    rows = crud.query_histories(db, after=after, limit=limit, **filters)
+    next_cursor = f"{rows[-1].time.isoformat()}_{rows[-1].id}" if len(rows) == limit else None
+    return {"items": [history_to_dict(row) for row in rows], "next_cursor": next_cursor}
+
+
+@app.get("/history/export")
+def export_history(number_plate: Optional[str] = None, status: Optional[str] = None,
+                   start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                   order: str = "asc", format: str = "csv", lot_id: Optional[str] = None):
+    """Stream every matching history row as CSV or NDJSON, oldest first by default"""
+    filters = history_filters(number_plate, status, start, end, order, lot_id)
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    
+    def rows():
+        # Own session: the response body is produced after the endpoint returns
+        db = SessionLocal()
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if format == "csv":
+                writer.writerow(["id", "number_plate", "position", "status", "time", "lot_id"])
+            for i, history in enumerate(crud.iter_histories(db, config.history_export_batch_size, **filters)):
+                row = history_to_dict(history)
+                if format == "csv":
+                    writer.writerow(row.values())
+                else:
+                    buffer.write(json.dumps(row) + "\n")
+                # Send in chunks of a few hundred rows rather than one write per row
+                if i % 500 == 499:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        finally:
+            db.close()
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename=history.{format}"})
+
+
 @app.get("/")
 def root():
     return {"message": "Backend is running!"}
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "model_loaded": True}
+    status = {
+        "status": "healthy" if inference_ready() else inference_status["state"],
+        "model_loaded": inference_ready(),
+        "load_seconds": inference_status["load_seconds"],
+        "warmup_seconds": inference_status["warmup_seconds"],
+    }
+    if inference_status["error"]:
+        status["error"] = inference_status["error"]
+    # 503 until the model can serve, so load balancers hold traffic during startup
+    return JSONResponse(status_code=200 if inference_ready() else 503, content=status)
+
+
+@app.get("/metrics/inference")
+def inference_metrics():
+    if scheduler is None:
+        return {"state": inference_status["state"]}
+    stats = scheduler.get_stats()
+    # In multi-process mode every worker keeps its own OCR cache
+    if model is not None and model.ocr_cache is not None:
+        stats['ocr_cache'] = model.ocr_cache.get_stats()
+    stats['active_streams'] = active_streams
+    return stats
+
+
+@app.get("/metrics/history")
+def history_metrics():
+    if history_writer is None:
+        return {"write_behind": False}
+    return {"write_behind": True, **history_writer.get_stats()}
+
+
+def get_lot(lot_id: Optional[str] = None):
+    """The requested parking lot (default lot for None), or 404"""
+    if lot_id is not None and lot_id not in lots:
+        raise HTTPException(status_code=404, detail=f"Unknown lot '{lot_id}'")
+    return lots.get(lot_id)
+
+
+# Parking endpoints are plain functions: FastAPI runs them in its threadpool, and
+# each one holds only its own lot's lock, so lots never wait for each other.
+@app.get("/lots")
+def list_lots():
+    result = []
+    for lot in lots:
+        with lot.lock:
+            result.append({
+                "lot_id": lot.lot_id,
+                "map_size": lot.path_finder.map_size,
+                "entrances": lot.path_finder.entrances,
+                "status": lot.path_finder.get_parking_status()
+            })
+    return {"default_lot_id": lots.default_lot_id, "lots": result}
+
+
+@app.get("/status")
+def occupancy_status(lot_id: Optional[str] = None, verify: bool = False):
+    """
+    Occupancy of one lot (or of every lot) overall, per zone and per distance band
+    
+    Served from counters kept up to date by every state change, so polling is
+    cheap on any lot size. verify=true also compares them with a full scan.
+    """
+    selected = [get_lot(lot_id)] if lot_id is not None else list(lots)
+    result = {}
+    for lot in selected:
+        with lot.lock:
+            result[lot.lot_id] = lot.path_finder.get_occupancy()
+            if verify:
+                errors = lot.path_finder.check_counters()
+                result[lot.lot_id]["consistent"] = not errors
+                if errors:
+                    result[lot.lot_id]["errors"] = errors
+    
+    total = sum(status["total_parkable_spots"] for status in result.values())
+    parked = sum(status["parked_spots"] for status in result.values())
+    return {
+        "total_parkable_spots": total,
+        "empty_spots": total - parked,
+        "parked_spots": parked,
+        "occupancy_rate": parked / total if total > 0 else 0,
+        "lots": result
+    }
 
 
 @app.post("/removed_parked_position")
-async def removed_parked_position(data: dict):
+def removed_parked_position(data: dict, db: Session = Depends(get_db)):
+    """
+    Free a spot by {"position", "lot_id"}, or by {"number_plate"} alone (e.g. an exit camera read)
+    
+    A plate-only exit also records the "Unparked" history row, so the plate
+    is not linked to the spot again when the index is rebuilt at startup.
+    """
+    if 'position' not in data and data.get('number_plate'):
+        plate = data['number_plate']
+        spot = lots.unpark_plate(plate)
+        if spot is None:
+            raise HTTPException(status_code=404, detail=f"Vehicle {plate} is not parked")
+        record_histories(db, [{"number_plate": plate, "position": format_position(spot[1]),
+                               "status": HISTORY_UNPARKED, "time": datetime.datetime.now(), "lot_id": spot[0]}])
+        return {
+            "message": f"Remove parked position successfully!",
+            "location": spot[1],
+            "lot_id": spot[0],
+            "number_plate": plate
+        }
+    
     x,y= data['position'][0], data['position'][1]
-    path_finder.remove_parked_position((x,y))
+    lot = get_lot(data.get('lot_id'))
+    with lot.lock:
+        plate = lot.vehicles.plate_at(lot.lot_id, (x,y))
+        if not lot.unpark((x,y)):
+            raise HTTPException(status_code=409, detail=f"No vehicle parked at location {(x,y)}")
     return {
         "message": f"Remove parked position successfully!",
-        "location": (x,y)
+        "location": (x,y),
+        "lot_id": lot.lot_id,
+        "number_plate": plate
     }
 
+
 @app.post("/park_vehicle")
-async def park_vehicle(data: dict):
+def park_vehicle(data: dict):
     x,y= data['position'][0], data['position'][1]
-    path_finder.park_vehicle((x,y))
+    plate = data.get('number_plate') or data.get('plate')
+    lot = get_lot(data.get('lot_id'))
+    try:
+        parked = lot.park((x,y), plate)
+    except VehicleAlreadyParked as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not parked:
+        raise HTTPException(status_code=409, detail=f"Location {(x,y)} is not free")
     return{
         "message": "Successfully",
-        "location": (x,y)
+        "location": (x,y),
+        "lot_id": lot.lot_id
+    }
+
+
+@app.get("/vehicles/{plate}")
+def find_vehicle(plate: str):
+    """Where a vehicle is parked, with the route to it from the nearest entrance"""
+    spot = lots.vehicles.spot_of(plate)
+    if spot is None or spot[0] not in lots:
+        raise HTTPException(status_code=404, detail=f"Vehicle {plate} is not parked")
+    lot = lots.get(spot[0])
+    with lot.lock:
+        route = lot.path_finder.get_route(spot[1])
+    return {
+        "number_plate": plate,
+        "lot_id": spot[0],
+        "location": spot[1],
+        "distance": len(route) - 1 if route else None,
+        "route": route
+    }
+
+
+@app.get("/route/{x}/{y}")
+def get_route(x: int, y: int, lot_id: Optional[str] = None):
+    """Shortest route from the nearest entrance to (x, y), served from the route cache"""
+    lot = get_lot(lot_id)
+    with lot.lock:
+        route = lot.path_finder.get_route((x, y))
+        map_version = lot.path_finder.map_version
+    if not route:
+        raise HTTPException(status_code=404, detail=f"Location {(x, y)} is not reachable")
+    
+    return {
+        "location": (x, y),
+        "lot_id": lot.lot_id,
+        "distance": len(route) - 1,
+        "route": route,
+        "map_version": map_version
+    }
+
+
+# Cell types accepted by /map/cell
+MAP_CELL_TYPES = {"empty": EMPTY, "obstacle": OBSTACLE, "path": PATH_ONLY}
+
+
+@app.post("/map/cell")
+def update_map_cell(data: dict):
+    """Open, block or mark as road a single cell; distances are repaired incrementally"""
+    x,y= data['position'][0], data['position'][1]
+    cell_type = data.get('type')
+    if cell_type not in MAP_CELL_TYPES:
+        raise HTTPException(status_code=400, detail=f"type must be one of {list(MAP_CELL_TYPES)}")
+    
+    lot = get_lot(data.get('lot_id'))
+    with lot.lock:
+        if not lot.path_finder.set_cell_type((x,y), MAP_CELL_TYPES[cell_type]):
+            raise HTTPException(status_code=400, detail=f"Cannot change location {(x,y)} to {cell_type}")
+        status = lot.path_finder.get_parking_status()
+    
+    return {
+        "message": f"Location {(x,y)} is now {cell_type}",
+        "location": (x,y),
+        "lot_id": lot.lot_id,
+        "status": status
     }
 
 
 @app.post("/find_shortest_parking_lot")
-async def find_shortest_parking_lot():
-    location = path_finder.find_shortest_blank_position()
+def find_shortest_parking_lot(lot_id: Optional[str] = None, entrance: Optional[int] = None,
+                              number_plate: Optional[str] = None, db: Session = Depends(get_db)):
+    """Park at the closest free spot of a lot, preferring spots nearest to the given entrance, and record it in history"""
+    lot = get_lot(lot_id)
+    if entrance is not None and not 0 <= entrance < len(lot.path_finder.entrances):
+        raise HTTPException(status_code=404, detail=f"Unknown entrance {entrance} for lot '{lot.lot_id}'")
+    
+    # Find and reserve in one locked step, so concurrent arrivals never share a spot
+    # and one plate never holds two
+    try:
+        location = lot.allocate(entrance, number_plate or None)
+    except VehicleAlreadyParked as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
     if location is None:
         raise HTTPException(status_code=404, detail="No available parking spots.")
     
-    success = path_finder.park_vehicle(location)
-    
-    if not success:
-        raise HTTPException(status_code=400, detail=f"Failed to park at location {location}")
+    try:
+        record_histories(db, [{"number_plate": number_plate or None, "position": format_position(location),
+                               "status": HISTORY_PARKED, "time": datetime.datetime.now(), "lot_id": lot.lot_id}])
+    except Exception:
+        # Keep the lot and the history in step: give the spot back
+        lot.unpark(location)
+        raise
     
     return {
         "message": f"Vehicle successfully parked at {location}",
-        "location": location
+        "location": location,
+        "lot_id": lot.lot_id
     }
 
 
+@app.post("/allocate_batch")
+def allocate_batch(data: dict, db: Session = Depends(get_db)):
+    """
+    Park a group of vehicles (convoy, bus, shift change) in one atomic step
+    
+    Expected format: {"count": K, "lot_id", "entrance", "adjacent": bool, "zone",
+    "number_plates": [K plates]}; count defaults to len(number_plates).
+    Either all K spots are reserved or none, and the K history rows are
+    written in one transaction.
+    """
+    plates = data.get('number_plates') or []
+    count = data.get('count', len(plates))
+    if not isinstance(count, int) or not 0 < count <= config.max_batch_allocation:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {config.max_batch_allocation}")
+    if plates and len(plates) != count:
+        raise HTTPException(status_code=400, detail="number_plates must have count entries")
+    named = [normalize_plate(plate) for plate in plates if plate]
+    if len(set(named)) != len(named):
+        raise HTTPException(status_code=400, detail="number_plates contains duplicates")
+    
+    lot = get_lot(data.get('lot_id'))
+    entrance, zone = data.get('entrance'), data.get('zone')
+    if entrance is not None and (not isinstance(entrance, int) or isinstance(entrance, bool)):
+        raise HTTPException(status_code=400, detail="entrance must be an integer")
+    if zone is not None and not isinstance(zone, str):
+        raise HTTPException(status_code=400, detail="zone must be a string")
+    if entrance is not None and not 0 <= entrance < len(lot.path_finder.entrances):
+        raise HTTPException(status_code=404, detail=f"Unknown entrance {entrance} for lot '{lot.lot_id}'")
+    if zone is not None and zone not in lot.path_finder.zones:
+        raise HTTPException(status_code=404, detail=f"Unknown zone '{zone}' for lot '{lot.lot_id}'")
+    
+    with lot.lock:
+        try:
+            locations = lot.allocate_many(count, entrance, bool(data.get('adjacent')), zone,
+                                          [plate or None for plate in plates])
+        except VehicleAlreadyParked as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if locations is None:
+            raise HTTPException(status_code=409, detail=f"Cannot fit {count} vehicles with these constraints")
+        routes = [lot.path_finder.get_route(location) for location in locations]
+    
+    now = datetime.datetime.now()
+    plates = plates or [None] * count
+    try:
+        record_histories(db, [{"number_plate": plate, "position": format_position(location),
+                               "status": HISTORY_PARKED, "time": now, "lot_id": lot.lot_id}
+                              for plate, location in zip(plates, locations)])
+    except Exception:
+        # Keep the lot and the history in step: give the spots back
+        for location in locations:
+            lot.unpark(location)
+        raise
+    
+    return {
+        "message": f"{count} vehicles successfully parked",
+        "lot_id": lot.lot_id,
+        "assignments": [
+            {"number_plate": plate, "location": location, "distance": len(route) - 1, "route": route}
+            for plate, location, route in zip(plates, locations, routes)
+        ]
+    }
 
 
 # Method 1: Upload image file directly
@@ -141,19 +656,14 @@ async def predict_upload(file: UploadFile = File(...)):
         # Read image file
         contents = await file.read()
         
-        # Convert to OpenCV format
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode off the event loop
+        image = await run_in_threadpool(load_frame, contents)
         
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid image file")
         
-        # Convert BGR to RGB (OpenCV loads as BGR, but our model expects RGB)
-        
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image = cv2.resize(image,(640,640))
         # Get predictions
-        plate_texts = model.get_plate_texts(image)
+        plate_texts = (await recognize(image)).plate_texts
         
         return PredictionResponse(
             success=True,
@@ -169,7 +679,7 @@ async def predict_upload(file: UploadFile = File(...)):
 
 # Method 2: Provide image file path (fixed version of your original)
 @app.post("/predict/filepath/", response_model=PredictionResponse)
-def predict_filepath(input_data: ModelInput):
+async def predict_filepath(input_data: ModelInput):
     """
     Provide image file path and get number plate predictions
     """
@@ -177,15 +687,15 @@ def predict_filepath(input_data: ModelInput):
         image_file = input_data.image_file  # Fixed: access attribute properly
         
         # Check if file exists and read image
-        image = cv2.imread(image_file)
+        if not os.path.isfile(image_file):
+            raise HTTPException(status_code=400, detail=f"Could not read image from path: {image_file}")
+        with open(image_file, "rb") as f:
+            image = await run_in_threadpool(load_frame, f.read())
         if image is None:
             raise HTTPException(status_code=400, detail=f"Could not read image from path: {image_file}")
         
-        # Fixed: cv2.cvtColor needs the image parameter first
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image = cv2.resize(image,(640,640))
         # Get predictions (using text-only method for API response)
-        plate_texts = model.get_plate_texts(image)
+        plate_texts = (await recognize(image)).plate_texts
         
         return PredictionResponse(
             success=True,
@@ -201,7 +711,7 @@ def predict_filepath(input_data: ModelInput):
 
 # Method 3: Base64 encoded image
 @app.post("/predict/base64/")
-def predict_base64(image_data: dict):
+async def predict_base64(image_data: dict):
     """
     Send base64 encoded image and get number plate predictions.
     Expected format: {"image": "base64_encoded_string"}
@@ -217,23 +727,17 @@ def predict_base64(image_data: dict):
 
         # Decode and convert to OpenCV format
         image_bytes = base64.b64decode(image_b64)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = await run_in_threadpool(load_frame, image_bytes)
 
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid base64 image data")
 
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image = cv2.resize(image, (640, 640))
-
-        # Predict plates and result images
-        plate_texts = model.get_plate_texts(image)
-        result_images = model.predict(image)
+        # Predict plates and result images in a single detector pass
+        result = await recognize(image)
+        plate_texts = result.plate_texts
         
         result_images_b64 = []
-        for img in result_images:
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-            _, buffer = cv2.imencode('.jpg', img_bgr)
+        for buffer in await run_in_threadpool(encode_result_images, result):
             img_b64 = base64.b64encode(buffer).decode('utf-8')
             result_images_b64.append(img_b64)
        
@@ -251,6 +755,72 @@ def predict_base64(image_data: dict):
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 
+# Method 4: Raw binary image, no base64/JSON on the way in
+@app.post("/predict/binary/")
+async def predict_binary(request: Request):
+    """
+    Send the encoded image as the raw request body (application/octet-stream or image/*)
+    or as a multipart "file" field.
+
+    The response format follows the Accept header:
+        image/jpeg: first annotated plate as JPEG; plate texts in the X-Plate-Texts header (JSON list)
+        application/x-msgpack: {"plate_texts", "detections", "result_images": [JPEG bytes]}
+        otherwise: the same JSON as /predict/base64/
+    """
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Missing 'file' field in multipart body")
+            contents = await upload.read()
+        else:
+            contents = await request.body()
+        if not contents:
+            raise HTTPException(status_code=400, detail="Empty request body")
+
+        image = await run_in_threadpool(load_frame, contents)
+        if image is None:
+            raise HTTPException(status_code=400, detail="Invalid image data")
+
+        result = await recognize(image)
+        plate_texts = result.plate_texts
+        buffers = await run_in_threadpool(encode_result_images, result)
+
+        accept = request.headers.get("accept", "")
+        if "image/jpeg" in accept:
+            return Response(
+                content=buffers[0].tobytes() if buffers else b"",
+                media_type="image/jpeg",
+                headers={"X-Plate-Texts": json.dumps(plate_texts), "X-Num-Plates": str(len(plate_texts))}
+            )
+        if "application/x-msgpack" in accept:
+            if msgpack is None:
+                raise HTTPException(status_code=406, detail="msgpack is not installed on the server")
+            payload = {
+                "success": True,
+                "plate_texts": plate_texts,
+                "num_plates_detected": len(plate_texts),
+                "detections": result.to_dict(),
+                "result_images": [buffer.tobytes() for buffer in buffers],
+            }
+            return Response(content=msgpack.packb(payload), media_type="application/x-msgpack")
+
+        return {
+            "success": True,
+            "plate_texts": plate_texts,
+            "message": f"Successfully detected {len(plate_texts)} number plates",
+            "num_plates_detected": len(plate_texts),
+            "result_images": [base64.b64encode(buffer).decode('utf-8') for buffer in buffers]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
 # Optional: Get detailed results with visualization
 @app.post("/predict/detailed/")
 async def predict_detailed(file: UploadFile = File(...)):
@@ -265,28 +835,20 @@ async def predict_detailed(file: UploadFile = File(...)):
         
         # Read image file
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = await run_in_threadpool(load_frame, contents)
         
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid image file")
         
-        # Convert BGR to RGB
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image = cv2.resize(image,(640,640))
-        
         # Get detailed predictions with visualizations
-        result_images = model.predict(image)
-        plate_texts = model.get_plate_texts(image)
+        result = await recognize(image)
+        plate_texts = result.plate_texts
         
         # Convert result images to base64 for JSON response
         result_images_b64 = []
         save_dir = "saved_results"
         os.makedirs(save_dir, exist_ok=True)
-        for i,img in enumerate(result_images):
-            # Convert RGB back to BGR for encoding
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-            _, buffer = cv2.imencode('.jpg', img_bgr)
+        for i, buffer in enumerate(await run_in_threadpool(encode_result_images, result)):
             img_b64 = base64.b64encode(buffer).decode('utf-8')
             result_images_b64.append(img_b64)
 
@@ -298,6 +860,7 @@ async def predict_detailed(file: UploadFile = File(...)):
             "success": True,
             "plate_texts": plate_texts,
             "result_images": result_images_b64,
+            "detections": result.to_dict(),
             "num_plates_detected": len(plate_texts),
             "message": f"Successfully processed {len(plate_texts)} number plates"
         }
@@ -307,9 +870,82 @@ async def predict_detailed(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+def process_stream_frame(stream: StreamRecognizer, contents: bytes, frame_index: int):
+    image = decode_image(contents)
+    if image is None:
+        return {"frame_index": frame_index, "error": "Invalid image frame"}
+    return stream.process(image, frame_index)
+
+
+@app.websocket("/ws/stream")
+async def stream_plates(websocket: WebSocket):
+    """
+    Continuous plate reading for a camera feed.
+    Send encoded frames (JPEG/PNG) as binary messages; one JSON message comes back per processed frame.
+    Frames arriving while the previous one is still being processed replace it, so a slow
+    detector skips frames instead of building a backlog. OCR runs once per plate track.
+    Streams call the detector directly rather than through the scheduler, so at most
+    config.stream_max_concurrent run at once; further connections are closed with 1013.
+    """
+    global active_streams
+    await websocket.accept()
+    if not inference_ready():
+        await websocket.close(code=1013, reason="Model is not ready")
+        return
+    if model is None:
+        await websocket.close(code=1013, reason="Streaming requires in-process inference (inference_processes = 0)")
+        return
+    if active_streams >= config.stream_max_concurrent:
+        await websocket.close(code=1013, reason="Too many open streams, try again later")
+        return
+    active_streams += 1
+
+    stream = StreamRecognizer(model, config)
+    frames = asyncio.Queue(maxsize=1)
+    skipped = 0
+
+    async def receive_frames():
+        nonlocal skipped
+        frame_index = 0
+        while True:
+            contents = await websocket.receive_bytes()
+            if frames.full():
+                frames.get_nowait()  # Drop the stale frame
+                skipped += 1
+            frames.put_nowait((frame_index, contents))
+            frame_index += 1
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            next_frame = asyncio.create_task(frames.get())
+            done, _ = await asyncio.wait({next_frame, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if next_frame not in done:
+                next_frame.cancel()
+                break  # Client disconnected
+            frame_index, contents = next_frame.result()
+            event = await run_in_threadpool(process_stream_frame, stream, contents, frame_index)
+            event["skipped_frames"] = skipped
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        active_streams -= 1
+
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
+    # Endpoints raise 404s that say what is missing (lot, entrance, vehicle, route);
+    # only unknown paths, which carry the default "Not Found", get the generic message
+    detail = getattr(exc, "detail", None)
+    if detail and detail != "Not Found":
+        return JSONResponse(
+            status_code=404,
+            content={"detail": detail},
+            headers=getattr(exc, "headers", None)
+        )
     return JSONResponse(
         status_code=404,
         content={"message": "Endpoint not found"}
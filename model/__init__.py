@@ -1,3 +1,11 @@
-from .basemodel import Number_Plate_Recognizer
+from .basemodel import Number_Plate_Recognizer, PlateRecognitionResult
+from .detectors import TorchDetector, ONNXDetector, build_detector
+from .ocr_cache import PlateOCRCache, plate_hash
+from .scheduler import InferenceScheduler, InferenceQueueFull
+from .process_pool import FrameTooLarge, ProcessInferencePool, SharedFrameRing
+from .stream import StreamRecognizer, PlateTracker, read_frames
 
-__all__ = ['Number_Plate_Recognizer']
\ No newline at end of file
+__all__ = ['Number_Plate_Recognizer', 'PlateRecognitionResult', 'PlateOCRCache', 'plate_hash',
+           'TorchDetector', 'ONNXDetector', 'build_detector',
+           'InferenceScheduler', 'InferenceQueueFull',
+           'FrameTooLarge', 'ProcessInferencePool', 'SharedFrameRing', 'StreamRecognizer', 'PlateTracker', 'read_frames']
\ No newline at end of file
@@ -1,37 +1,116 @@
 import cv2
 import numpy as np
 import re
-from ultralytics import YOLO
-import os
-from fast_plate_ocr import ONNXPlateRecognizer
+import threading
+from contextlib import nullcontext
+from utils.preprocessing import letterbox, scale_boxes, postprocess_boxes
+from .ocr_cache import PlateOCRCache, plate_hash
+from .detectors import build_detector
+
+
+class PlateRecognitionResult():
+    """Output of one detect + OCR pass over a frame. Rendered images are built on demand."""
+    def __init__(self, image, boxes, scores, plate_images, texts, confidences, renderer):
+        self.image = image
+        self.boxes = boxes  # (N, 4) xyxy in image coordinates
+        self.scores = scores  # (N,) detector confidences
+        self.plate_images = plate_images
+        self.texts = texts  # raw OCR strings without padding characters
+        self.confidences = confidences  # (N,) mean OCR character confidence
+        self._renderer = renderer
+        self._rendered = None
+
+    def __len__(self):
+        return len(self.texts)
+
+    @property
+    def plate_texts(self):
+        """Plate strings formatted for display (two-line plates split after 4 characters)"""
+        return [text[:4] + "\n" + text[4:] for text in self.texts]
+
+    def render(self):
+        """Annotated plate crops, rendered once and cached"""
+        if self._rendered is None:
+            self._rendered = self._renderer(self.plate_images, self.plate_texts)
+        return self._rendered
+
+    def to_dict(self):
+        return {
+            'plate_texts': self.plate_texts,
+            'boxes': self.boxes.tolist(),
+            'scores': self.scores.tolist(),
+            'confidences': self.confidences.tolist(),
+        }
+
 
 class Number_Plate_Recognizer():
     def __init__(self, config):
+        self.config = config
         try:
-            self.detector = YOLO(config.yolo_weights_file)
+            self.detector = build_detector(config)
         except Exception as e:
-            raise Exception(f'Your YOLO weights file is not available!!! Error: {str(e)}')
+            raise Exception(f'Your {config.detector_backend} detector weights are not available!!! Error: {str(e)}')
+        # Imported here so importing the package (e.g. main.py at startup) stays cheap
+        from fast_plate_ocr import ONNXPlateRecognizer
         self.reader = ONNXPlateRecognizer("global-plates-mobile-vit-v2-model")
+        # Crops are resized once, straight to the OCR model's native input size
+        # Depending on the fast_plate_ocr version the reader's config is a dict or an object
+        reader_config = getattr(self.reader, 'config', None)
+        if isinstance(reader_config, dict):
+            read = reader_config.get
+        else:
+            read = lambda name, default: getattr(reader_config, name, default)
+        self.ocr_input_size = (read('img_width', config.ocr_img_width),
+                               read('img_height', config.ocr_img_height))
+        self.ocr_cache = None
+        if config.ocr_cache_size > 0:
+            self.ocr_cache = PlateOCRCache(config.ocr_cache_size, config.ocr_cache_ttl,
+                                           config.ocr_cache_max_distance)
+        # The ultralytics predictor is not thread-safe; ONNX Runtime sessions and OCR are
+        self._detector_lock = nullcontext() if self.detector.thread_safe else threading.Lock()
         
+    def warmup(self, num_frames: int = 1):
+        """
+        Run dummy frames through the detector and OCR so graph optimization, memory
+        allocation and thread-pool startup happen before the first real request
+        """
+        if num_frames <= 0:
+            return
+        frame = np.zeros((self.config.img_size, self.config.img_size, 3), dtype=np.uint8)
+        for _ in range(num_frames):
+            self.detect_batch([frame])
+            # Straight to the reader: dummy reads must not land in the OCR cache
+            plate = np.zeros((self.ocr_input_size[1], self.ocr_input_size[0]), dtype=np.uint8)
+            self.reader.run(np.stack([plate]))
+
     def extract_number_plate_images(self, image, result):
-        plate_images = []
-
-        if result[0].boxes is not None:
-            bboxes = result[0].boxes
-            for idx, bbox in enumerate(bboxes):
-                xyxy = bbox.xyxy
-                xmin = int(xyxy[0][0]) -5
-                ymin = int(xyxy[0][1]) -5
-                xmax = int(xyxy[0][2]) +5
-                ymax = int(xyxy[0][3]) +5
-                # Crop the plate image
-                plate_image = image[ymin:ymax, xmin:xmax]
-                plate_images.append(plate_image)
-
-        return plate_images
+        boxes, scores = self._boxes_and_scores(result[0])
+        boxes, _ = self.postprocess_boxes(boxes, scores, image.shape)
+        return self.crop_plates(image, boxes)
+
+    def postprocess_boxes(self, boxes, scores, image_shape):
+        """Pad, clamp and filter raw detector boxes using the plate_* settings in config"""
+        return postprocess_boxes(boxes, scores, image_shape,
+                                 padding=self.config.plate_crop_padding,
+                                 min_width=self.config.plate_min_width,
+                                 min_height=self.config.plate_min_height,
+                                 min_aspect=self.config.plate_min_aspect,
+                                 max_aspect=self.config.plate_max_aspect)
+
+    def crop_plates(self, image, boxes):
+        """Crop plate images for post-processed (N, 4) integer xyxy boxes"""
+        return [image[ymin:ymax, xmin:xmax] for xmin, ymin, xmax, ymax in boxes]
+
+    @staticmethod
+    def _boxes_and_scores(result):
+        if isinstance(result, tuple):  # (boxes, scores) from a detector backend
+            return result
+        if result.boxes is None:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros((0,), dtype=np.float32)
+        return result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy()
     
     def ocr_preprocessing(self, license_plate_image):
-        image = cv2.resize(license_plate_image,(640,640))
+        image = cv2.resize(license_plate_image, self.ocr_input_size, interpolation=cv2.INTER_AREA)
         if len(image.shape) == 3:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         else:
@@ -74,7 +153,8 @@ class Number_Plate_Recognizer():
             images.append(img)
         return images
     
-    def visualize_results(self, plate_images, plate_numbers):
+    @staticmethod
+    def visualize_results(plate_images, plate_numbers):
         result_images = []
         for i, (plate_img, plate_text) in enumerate(zip(plate_images, plate_numbers)):
             annotated_img = plate_img.copy()
@@ -97,32 +177,104 @@ class Number_Plate_Recognizer():
         return result_images
             
         
+    def read_plates(self, plate_images):
+        """
+        Run OCR over plate crops, returning (texts, confidences)
+
+        Crops are stacked into one (N, H, W) tensor and recognized in chunks of
+        config.ocr_max_batch_size, so each chunk costs a single ONNX Runtime call.
+        Crops whose perceptual hash matches a recent confident read are served
+        from self.ocr_cache and skip OCR entirely.
+        """
+        texts = [None] * len(plate_images)
+        confidences = np.zeros((len(plate_images),), dtype=np.float32)
+        if not plate_images:
+            return texts, confidences
+
+        keys = [None] * len(plate_images)
+        misses = list(range(len(plate_images)))
+        if self.ocr_cache is not None:
+            misses = []
+            for i, plate_image in enumerate(plate_images):
+                keys[i] = plate_hash(plate_image)
+                cached = self.ocr_cache.get(keys[i])
+                if cached is None:
+                    misses.append(i)
+                else:
+                    texts[i], confidences[i] = cached
+        if not misses:
+            return texts, confidences
+
+        batch = np.stack([self.ocr_preprocessing(plate_images[i]) for i in misses])
+        max_batch_size = max(1, self.config.ocr_max_batch_size)
+        for start in range(0, len(batch), max_batch_size):
+            ocr_results, probs = self.reader.run(batch[start:start + max_batch_size],
+                                                 return_confidence=True)
+            for i, res, prob in zip(misses[start:start + max_batch_size], ocr_results, probs):
+                texts[i] = re.sub("_", "", res)
+                confidences[i] = float(np.mean(prob))
+                # Only confident reads are reused; a bad read should get another chance
+                if self.ocr_cache is not None and confidences[i] >= self.config.ocr_confidence_threshold:
+                    self.ocr_cache.put(keys[i], texts[i], float(confidences[i]))
+        return texts, confidences
+
+    def detect_batch(self, input_images):
+        """
+        Run the detector only, returning a list of (boxes, scores) per image
+
+        Each frame is letterboxed to config.img_size for the config.detector_backend
+        detector (PyTorch, ONNX or INT8 ONNX) and the boxes are mapped
+        back to the frame's own coordinates, so crops come from the full-resolution image.
+        Boxes are padded, clamped and filtered, so every returned box yields a valid crop.
+        """
+        letterboxed = [letterbox(image, self.config.img_size) for image in input_images]
+        with self._detector_lock:
+            results = self.detector([padded for padded, _, _ in letterboxed])
+
+        detections = []
+        for image, (_, ratio, pad), (boxes, scores) in zip(input_images, letterboxed, results):
+            boxes = scale_boxes(boxes, ratio, pad, image.shape)
+            detections.append(self.postprocess_boxes(boxes, scores, image.shape))
+        return detections
+
+    def recognize(self, input_image):
+        """
+        Detect and read every plate in the image with a single detector pass
+
+        Returns:
+            PlateRecognitionResult with boxes, scores, crops, OCR texts and confidences
+        """
+        return self.recognize_batch([input_image])[0]
+
+    def recognize_batch(self, input_images):
+        """
+        Recognize plates in several frames with one batched detector call and
+        one batched OCR pass over every crop from every frame
+
+        Returns:
+            list of PlateRecognitionResult, one per input image
+        """
+        per_frame = []
+        all_plate_images = []
+        for input_image, (boxes, scores) in zip(input_images, self.detect_batch(input_images)):
+            plate_images = self.crop_plates(input_image, boxes)
+            per_frame.append((input_image, boxes, scores, plate_images))
+            all_plate_images.extend(plate_images)
+
+        texts, confidences = self.read_plates(all_plate_images)
+
+        recognitions = []
+        offset = 0
+        for input_image, boxes, scores, plate_images in per_frame:
+            end = offset + len(plate_images)
+            recognitions.append(PlateRecognitionResult(
+                input_image, boxes, scores, plate_images,
+                texts[offset:end], confidences[offset:end], self.visualize_results))
+            offset = end
+        return recognitions
+
     def predict(self, input_image):
-        result = self.detector(input_image)
-        
-        plate_images = self.extract_number_plate_images(input_image, result)
-        plate_numbers = []
-        
-        for plate_image in plate_images:
-            preprocessed_image = self.ocr_preprocessing(plate_image)
-            
-            ocr_results = self.reader.run(preprocessed_image)
-            for res in ocr_results:
-                plate_numbers.append(re.sub("_","",res))
-        
-        plate_numbers = [number[:4] + "\n"+ number[4:] for number in plate_numbers]
-        return self.visualize_results( plate_images, plate_numbers)
-    
+        return self.recognize(input_image).render()
+
     def get_plate_texts(self, input_image):
-        result = self.detector(input_image)
-        plate_images = self.extract_number_plate_images(input_image, result)
-        plate_numbers = []
-        
-        for plate_image in plate_images:
-            preprocessed_image = self.ocr_preprocessing(plate_image)
-            ocr_results = self.reader.run(preprocessed_image)
-            for res in ocr_results:
-                plate_numbers.append(re.sub("_","",res))
-            
-        plate_numbers = [number[:4] + "\n"+ number[4:]  for number in plate_numbers ]
-        return plate_numbers
\ No newline at end of file
+        return self.recognize(input_image).plate_texts
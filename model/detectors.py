@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+
+class TorchDetector():
+    """Ultralytics YOLO on PyTorch (the .pt training checkpoint)"""
+    # The ultralytics predictor keeps per-call state and is not safe to share between threads
+    thread_safe = False
+
+    def __init__(self, config):
+        from ultralytics import YOLO
+        self.config = config
+        self.model = YOLO(config.yolo_weights_file)
+
+    def __call__(self, images):
+        """Detect plates in letterboxed images, returning (boxes, scores) per image"""
+        results = self.model(list(images), verbose=False, **self.config.get_yolo_args())
+        detections = []
+        for result in results:
+            if result.boxes is None:
+                detections.append((np.zeros((0, 4), dtype=np.float32), np.zeros((0,), dtype=np.float32)))
+            else:
+                detections.append((result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy()))
+        return detections
+
+
+class ONNXDetector():
+    """
+    YOLO exported to ONNX (see export_detector.py), run with ONNX Runtime.
+
+    Used for both the float and the INT8-quantized export. Inputs must already be
+    letterboxed to config.img_size; decoding and NMS mirror ultralytics so the boxes
+    are interchangeable with TorchDetector's.
+    """
+    thread_safe = True
+
+    def __init__(self, config, weights_file: str):
+        import onnxruntime as ort
+        self.config = config
+        options = ort.SessionOptions()
+        if config.onnx_intra_op_threads > 0:
+            options.intra_op_num_threads = config.onnx_intra_op_threads
+        self.session = ort.InferenceSession(weights_file, sess_options=options,
+                                            providers=config.onnx_providers)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def preprocess(self, images) -> np.ndarray:
+        """BGR HWC uint8 images -> RGB NCHW float32 in [0, 1]"""
+        batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+    def postprocess(self, output: np.ndarray):
+        """Decode (B, 4 + num_classes, anchors) predictions and apply NMS per image"""
+        detections = []
+        for prediction in output.transpose(0, 2, 1):
+            scores = prediction[:, 4:].max(axis=1)
+            keep = scores >= self.config.detection_confidence
+            prediction, scores = prediction[keep], scores[keep]
+
+            xywh = prediction[:, :4].copy()
+            xywh[:, :2] -= xywh[:, 2:] / 2  # center -> top-left
+            indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(),
+                                       self.config.detection_confidence,
+                                       self.config.detection_iou_threshold)
+            indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:self.config.max_detections]
+
+            boxes = xywh[indices]
+            boxes[:, 2:] += boxes[:, :2]
+            detections.append((boxes.astype(np.float32), scores[indices].astype(np.float32)))
+        return detections
+
+    def __call__(self, images):
+        """Detect plates in letterboxed images, returning (boxes, scores) per image"""
+        output = self.session.run(None, {self.input_name: self.preprocess(images)})[0]
+        return self.postprocess(output)
+
+
+DETECTOR_BACKENDS = ['torch', 'onnx', 'onnx-int8']
+
+
+def build_detector(config):
+    """Create the detector selected by config.detector_backend"""
+    backend = config.detector_backend
+    if backend == 'torch':
+        return TorchDetector(config)
+    if backend == 'onnx':
+        return ONNXDetector(config, config.onnx_weights_file)
+    if backend == 'onnx-int8':
+        return ONNXDetector(config, config.onnx_int8_weights_file)
+    raise ValueError(f"Unknown detector_backend '{backend}', expected one of {DETECTOR_BACKENDS}")
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def plate_hash(plate_image) -> int:
+    """
+    64-bit difference hash (dHash) of a plate crop.
+
+    The crop is normalized to grayscale 9x8 before comparing horizontally
+    adjacent pixels, so small shifts, scale changes and exposure drift between
+    frames of the same plate give hashes within a few bits of each other.
+    """
+    if plate_image.ndim == 3:
+        plate_image = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(plate_image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+# Near-duplicate lookups split the hash into max_distance + 1 bands; more than
+# this many would make the bands too narrow to narrow down candidates
+MAX_HASH_DISTANCE = 7
+
+
+def hash_bands(max_distance: int):
+    """(shift, mask) of the max_distance + 1 bit ranges the 64-bit hash is split into"""
+    count = max_distance + 1
+    bounds = [64 * i // count for i in range(count + 1)]
+    return [(low, (1 << (high - low)) - 1) for low, high in zip(bounds, bounds[1:])]
+
+
+class PlateOCRCache():
+    """
+    Thread-safe LRU + TTL cache of OCR reads keyed by plate_hash.
+
+    By default a lookup only hits on the exact hash, an O(1) dict lookup.
+    This is the intended near-duplicate rule: the 9x8 downsample already maps
+    re-compressed frames of a plate to the same hash, but plates that differ
+    in one character are frequently within 1-3 bits. With max_distance > 0 it also hits on a live entry whose hash is within
+    max_distance bits (Hamming distance), so near-duplicate crops of a car
+    waiting at the barrier reuse the earlier read. Entries are indexed by
+    max_distance + 1 bands of their hash; two hashes that close agree on at
+    least one whole band, so only entries sharing a band are compared. A
+    query that is equally close to entries with different texts is a miss.
+    """
+    def __init__(self, max_size: int, ttl: float, max_distance: int = 0):
+        if not 0 <= max_distance <= MAX_HASH_DISTANCE:
+            raise ValueError(f"max_distance must be between 0 and {MAX_HASH_DISTANCE}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # hash -> (text, confidence, expires_at)
+        self._bands = hash_bands(max_distance) if max_distance > 0 else []
+        self._buckets = {}  # (band, band bits) -> hashes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _band_keys(self, key: int):
+        return [(band, (key >> shift) & mask) for band, (shift, mask) in enumerate(self._bands)]
+
+    def _remove(self, key: int):
+        del self._entries[key]
+        for band_key in self._band_keys(key):
+            bucket = self._buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def _near_match(self, key: int, now: float) -> Optional[int]:
+        best, best_distance, ambiguous = None, self.max_distance + 1, False
+        candidates = set()
+        for band_key in self._band_keys(key):
+            candidates.update(self._buckets.get(band_key, ()))
+        for cached_key in candidates:
+            if self._entries[cached_key][2] <= now:
+                continue
+            distance = bin(cached_key ^ key).count("1")
+            if distance > self.max_distance:
+                continue
+            if distance < best_distance:
+                best, best_distance, ambiguous = cached_key, distance, False
+            elif distance == best_distance and self._entries[cached_key][0] != self._entries[best][0]:
+                ambiguous = True
+        return None if ambiguous else best
+
+    def get(self, key: int) -> Optional[Tuple[str, float]]:
+        now = time.monotonic()
+        with self._lock:
+            match = key if key in self._entries else None
+            if match is not None and self._entries[match][2] <= now:
+                self._remove(match)
+                match = None
+            if match is None and self._bands:
+                match = self._near_match(key, now)
+
+            if match is not None:
+                text, confidence, _ = self._entries[match]
+                self._entries.move_to_end(match)
+                self.hits += 1
+                return text, confidence
+
+            self.misses += 1
+            return None
+
+    def put(self, key: int, text: str, confidence: float):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (text, confidence, time.monotonic() + self.ttl)
+            for band_key in self._band_keys(key):
+                self._buckets.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
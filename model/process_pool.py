@@ -0,0 +1,346 @@
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from .basemodel import Number_Plate_Recognizer, PlateRecognitionResult
+from .scheduler import InferenceQueueFull
+
+
+class FrameTooLarge(ValueError):
+    """Raised when a frame cannot be fitted into a shared memory slot"""
+    def __init__(self, nbytes: int, slot_bytes: int):
+        super().__init__(f"Frame of {nbytes} bytes does not fit a {slot_bytes}-byte shared memory slot; "
+                         f"increase Config.shm_slot_bytes")
+        self.nbytes = nbytes
+        self.slot_bytes = slot_bytes
+
+
+def fit_frame(image: np.ndarray, max_bytes: int) -> np.ndarray:
+    """
+    Downscale a frame, keeping its aspect ratio, until it takes at most max_bytes
+
+    Frames that already fit are returned unchanged. The detector letterboxes
+    to img_size anyway, so only the plate crops lose resolution, and slots
+    sized for 1080p keep plates far above the OCR input size.
+    """
+    if image.nbytes <= max_bytes or image.ndim < 2:
+        return image
+    height, width = image.shape[:2]
+    scale = (max_bytes / image.nbytes) ** 0.5
+    new_width, new_height = max(1, int(width * scale)), max(1, int(height * scale))
+    return cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+
+class SharedFrameRing():
+    """
+    Fixed-size frame slots in a single shared memory block.
+
+    The API process writes a decoded frame into a free slot and only sends the
+    slot index, shape and dtype to the worker, which maps the same memory
+    without copying or pickling the pixels.
+    """
+    def __init__(self, num_slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=num_slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def view(self, slot: int, shape, dtype) -> np.ndarray:
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot: int, image: np.ndarray):
+        if image.nbytes > self.slot_bytes:
+            raise FrameTooLarge(image.nbytes, self.slot_bytes)
+        self.view(slot, image.shape, image.dtype)[...] = image
+
+    def close(self, unlink: bool = False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _worker_main(worker_id, config, ring_name, num_slots, slot_bytes, requests, results):
+    """Entry point of an inference worker process"""
+    threads = str(config.inference_threads_per_process)
+    os.environ.setdefault("OMP_NUM_THREADS", threads)
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", threads)
+    try:
+        import torch
+        torch.set_num_threads(config.inference_threads_per_process)
+    except ImportError:
+        pass
+
+    try:
+        model = Number_Plate_Recognizer(config)
+        model.warmup(config.warmup_frames)
+    except Exception as e:
+        results.put((None, False, (worker_id, f"{type(e).__name__}: {e}")))
+        return
+    ring = SharedFrameRing(num_slots, slot_bytes, name=ring_name)
+    max_batch_size = max(1, config.detector_max_batch_size)
+    results.put((None, True, (worker_id, None)))  # Ready signal
+
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+
+            # Drain whatever else is already waiting into one detector batch
+            batch = [request]
+            stop = False
+            while len(batch) < max_batch_size:
+                try:
+                    request = requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+
+            images = [ring.view(slot, shape, dtype) for _, slot, shape, dtype in batch]
+            try:
+                recognitions = model.recognize_batch(images)
+                for (request_id, _, _, _), recognition in zip(batch, recognitions):
+                    results.put((request_id, True, (
+                        recognition.boxes, recognition.scores,
+                        recognition.plate_images,
+                        recognition.texts, recognition.confidences)))
+            except Exception as e:
+                for request_id, _, _, _ in batch:
+                    results.put((request_id, False, f"{type(e).__name__}: {e}"))
+            if stop:
+                break
+    finally:
+        ring.close()
+
+
+class ProcessInferencePool():
+    """
+    Runs config.inference_processes worker processes, each with its own
+    Number_Plate_Recognizer, so detection and OCR are not limited by one
+    interpreter's GIL and thread settings.
+
+    Every worker owns a SharedFrameRing of config.shm_slots_per_worker slots.
+    Frames travel through shared memory; only small request tuples and the
+    detection results (boxes, scores, crops, texts) are pickled. Frames larger
+    than config.shm_slot_bytes are downscaled to fit (fit_frame), so results
+    refer to the downscaled frame. Exposes the same submit/recognize/get_stats
+    interface as InferenceScheduler.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.num_workers = max(1, config.inference_processes)
+        self.num_slots = max(1, config.shm_slots_per_worker)
+        self.slot_bytes = config.shm_slot_bytes
+        self.retry_after = config.inference_retry_after
+        self.health_check_interval = 0.5  # Seconds between checks for crashed workers
+
+        self._context = mp.get_context("spawn")
+        self._rings = []
+        self._request_queues = []
+        self._processes = []
+        self._free_slots = []
+        self._results = None
+        self._collector = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._request_ids = itertools.count()
+        self._next_worker = 0
+        self._rejected = 0
+        self._frames_processed = 0
+        self._ready_workers = set()
+        self._worker_errors = {}
+        self._ready_event = threading.Event()
+
+    def start(self):
+        if self._processes:
+            return
+        self._results = self._context.Queue()
+        for worker_id in range(self.num_workers):
+            ring = SharedFrameRing(self.num_slots, self.slot_bytes)
+            requests = self._context.Queue()
+            process = self._context.Process(
+                target=_worker_main, name=f"inference-worker-{worker_id}", daemon=True,
+                args=(worker_id, self.config, ring.name, self.num_slots, self.slot_bytes,
+                      requests, self._results))
+            process.start()
+            self._rings.append(ring)
+            self._request_queues.append(requests)
+            self._processes.append(process)
+            self._free_slots.append(list(range(self.num_slots)))
+
+        self._collector = threading.Thread(target=self._collect_results, name="inference-results",
+                                           daemon=True)
+        self._collector.start()
+
+    def stop(self, timeout: float = 5.0):
+        for requests in self._request_queues:
+            requests.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._results is not None:
+            self._results.put(None)
+        if self._collector is not None:
+            self._collector.join(timeout)
+
+        with self._lock:
+            for future, _, _, _ in self._pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference pool stopped"))
+            self._pending.clear()
+        for ring in self._rings:
+            ring.close(unlink=True)
+
+        self._rings, self._request_queues, self._processes, self._free_slots = [], [], [], []
+        self._results = None
+        self._collector = None
+        self._ready_workers = set()
+        self._worker_errors = {}
+        self._ready_event.clear()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """
+        Block until every worker has loaded and warmed up its model
+
+        Raises:
+            RuntimeError: if a worker failed to load its model
+        """
+        ready = self._ready_event.wait(timeout)
+        if self._worker_errors:
+            raise RuntimeError(f"Inference worker failed to start: {self._worker_errors}")
+        return ready
+
+    def _acquire_slot(self):
+        """Round-robin over workers, returning (worker_id, slot) or None if every ring is full"""
+        for i in range(self.num_workers):
+            worker_id = (self._next_worker + i) % self.num_workers
+            if self._free_slots[worker_id] and self._processes[worker_id].is_alive():
+                self._next_worker = (worker_id + 1) % self.num_workers
+                return worker_id, self._free_slots[worker_id].pop()
+        return None
+
+    def submit(self, image) -> Future:
+        """
+        Copy a frame into a worker's shared memory ring and return a Future of its
+        PlateRecognitionResult
+
+        Raises:
+            InferenceQueueFull: if every slot of every worker ring is in use
+            FrameTooLarge: if the frame cannot be downscaled into a slot
+        """
+        image = np.ascontiguousarray(fit_frame(image, self.slot_bytes))
+        future = Future()
+        with self._lock:
+            acquired = self._acquire_slot()
+            if acquired is None:
+                self._rejected += 1
+                raise InferenceQueueFull(self.retry_after)
+            worker_id, slot = acquired
+            request_id = next(self._request_ids)
+            try:
+                self._rings[worker_id].write(slot, image)
+            except FrameTooLarge:
+                self._free_slots[worker_id].append(slot)
+                raise
+            self._pending[request_id] = (future, worker_id, slot, image)
+
+        self._request_queues[worker_id].put((request_id, slot, image.shape, image.dtype.str))
+        return future
+
+    async def recognize(self, image):
+        """Awaitable wrapper around submit for use inside async handlers"""
+        return await asyncio.wrap_future(self.submit(image))
+
+    def _collect_results(self):
+        # Dead workers are checked on a timer, not only when the queue is idle:
+        # the other workers' results would otherwise keep a crash from being noticed
+        next_check = time.monotonic() + self.health_check_interval
+        while True:
+            now = time.monotonic()
+            if now >= next_check:
+                self._fail_dead_workers()
+                next_check = now + self.health_check_interval
+            try:
+                message = self._results.get(timeout=max(0.0, next_check - now))
+            except queue.Empty:
+                continue
+            if message is None:
+                break
+
+            request_id, ok, payload = message
+            if request_id is None:
+                # Worker startup report: payload is (worker_id, error)
+                worker_id, error = payload
+                if ok:
+                    self._ready_workers.add(worker_id)
+                else:
+                    self._worker_errors[worker_id] = error
+                if len(self._ready_workers) == self.num_workers or self._worker_errors:
+                    self._ready_event.set()
+                continue
+
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+                if entry is None:
+                    continue
+                future, worker_id, slot, image = entry
+                self._free_slots[worker_id].append(slot)
+                self._frames_processed += 1
+
+            if future.cancelled():
+                continue
+            if ok:
+                boxes, scores, plate_images, texts, confidences = payload
+                future.set_result(PlateRecognitionResult(
+                    image, boxes, scores, plate_images, texts, confidences,
+                    Number_Plate_Recognizer.visualize_results))
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _fail_dead_workers(self):
+        with self._lock:
+            dead = {worker_id for worker_id, process in enumerate(self._processes)
+                    if not process.is_alive()}
+            if not dead:
+                return
+            for request_id, (future, worker_id, slot, _) in list(self._pending.items()):
+                if worker_id in dead:
+                    del self._pending[request_id]
+                    self._free_slots[worker_id].append(slot)
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"Inference worker {worker_id} exited"))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'mode': 'process',
+                'workers': self.num_workers,
+                'workers_alive': sum(process.is_alive() for process in self._processes),
+                'workers_ready': len(self._ready_workers),
+                'slots_per_worker': self.num_slots,
+                'slot_bytes': self.slot_bytes,
+                'free_slots': [len(slots) for slots in self._free_slots],
+                'in_flight': len(self._pending),
+                'rejected': self._rejected,
+                'frames_processed': self._frames_processed,
+            }
@@ -0,0 +1,163 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class InferenceQueueFull(Exception):
+    """Raised by InferenceScheduler.submit when the admission queue is at capacity"""
+    def __init__(self, retry_after: float):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceScheduler():
+    """
+    Dynamic micro-batching between the API handlers and Number_Plate_Recognizer.
+
+    Frames submitted from any thread are queued and collected into a batch until
+    either config.detector_max_batch_size frames are waiting or the oldest frame
+    has waited config.detector_max_wait_ms. Each batch is a single
+    recognize_batch call (one YOLO forward pass), and every caller receives its
+    own PlateRecognitionResult through a Future.
+
+    Batches execute on a pool of config.inference_workers threads, so no
+    inference ever runs on the asyncio event loop. Admission is bounded by
+    config.inference_queue_size; once full, submit raises InferenceQueueFull
+    instead of letting latency grow without limit.
+    """
+    def __init__(self, model, config):
+        self.model = model
+        self.max_batch_size = max(1, config.detector_max_batch_size)
+        self.max_wait = config.detector_max_wait_ms / 1000.0
+        self.num_workers = max(1, config.inference_workers)
+        self.retry_after = config.inference_retry_after
+
+        self._queue = queue.Queue(maxsize=config.inference_queue_size)
+        # One slot per worker: the collector only forms a batch when a worker can take it,
+        # so frames keep accumulating (and batches keep growing) while all workers are busy
+        self._free_workers = threading.Semaphore(self.num_workers)
+        self._executor = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._rejected = 0
+        self._stats_lock = threading.Lock()
+        self._batch_size_histogram = Counter()
+        self._queue_depth_histogram = Counter()
+        self._max_queue_depth = 0
+        self._frames_processed = 0
+        self._batches_processed = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.num_workers,
+                                                thread_name_prefix="inference-worker")
+            self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(self, image) -> Future:
+        """
+        Queue a frame for recognition and return a Future of its PlateRecognitionResult
+
+        Raises:
+            InferenceQueueFull: if config.inference_queue_size frames are already waiting
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((image, future))
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            raise InferenceQueueFull(self.retry_after)
+        return future
+
+    async def recognize(self, image):
+        """Awaitable wrapper around submit for use inside async handlers"""
+        return await asyncio.wrap_future(self.submit(image))
+
+    def _collect_batch(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self._free_workers.acquire(timeout=0.1):
+                continue
+            batch = self._collect_batch()
+            if not batch:
+                self._free_workers.release()
+                continue
+            self._record_batch(len(batch))
+            self._executor.submit(self._process_batch, batch)
+
+    def _process_batch(self, batch):
+        try:
+            # Drop frames whose caller has already given up
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                return
+
+            try:
+                results = self.model.recognize_batch([image for image, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            self._free_workers.release()
+
+    def _record_batch(self, batch_size: int):
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._batch_size_histogram[batch_size] += 1
+            self._queue_depth_histogram[depth] += 1
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+            self._batches_processed += 1
+            self._frames_processed += batch_size
+
+    def get_stats(self) -> dict:
+        """Queue depth and batch-size histograms since startup"""
+        with self._stats_lock:
+            return {
+                'mode': 'thread',
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'workers': self.num_workers,
+                'rejected': self._rejected,
+                'max_queue_depth': self._max_queue_depth,
+                'batches_processed': self._batches_processed,
+                'frames_processed': self._frames_processed,
+                'mean_batch_size': (self._frames_processed / self._batches_processed
+                                    if self._batches_processed else 0),
+                'batch_size_histogram': dict(sorted(self._batch_size_histogram.items())),
+                'queue_depth_histogram': dict(sorted(self._queue_depth_histogram.items())),
+            }
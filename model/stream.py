@@ -0,0 +1,250 @@
+import argparse
+import json
+import math
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def read_frames(source, stride: int = 1) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Decode frames from a video file (or any cv2.VideoCapture source) lazily
+
+    Yields:
+        (frame_index, frame) for every stride-th frame, frames in BGR as decoded by OpenCV
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source: {source}")
+    try:
+        frame_index = 0
+        while True:
+            # grab() only demuxes; frames we skip never pay for retrieve()/decode
+            if not capture.grab():
+                break
+            if frame_index % stride == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                yield frame_index, frame
+            frame_index += 1
+    finally:
+        capture.release()
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+
+class PlateTrack():
+    def __init__(self, track_id: int, box: np.ndarray, score: float, frame_index: int):
+        self.track_id = track_id
+        self.box = box
+        self.score = score
+        self.first_seen = frame_index
+        self.last_seen = frame_index
+        self.text: Optional[str] = None
+        self.confidence = 0.0
+        self.ocr_attempts = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'track_id': self.track_id,
+            'box': [float(v) for v in self.box],
+            'score': float(self.score),
+            'plate_text': self.text,
+            'confidence': float(self.confidence),
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+
+class PlateTracker():
+    """
+    Greedy IoU tracker for plate boxes across frames.
+
+    Detections are matched to live tracks by highest IoU above
+    config.stream_iou_threshold; unmatched detections start new tracks and
+    tracks unseen for config.stream_max_track_age frames are dropped.
+    """
+    def __init__(self, config):
+        self.iou_threshold = config.stream_iou_threshold
+        self.max_age = config.stream_max_track_age
+        self.tracks: List[PlateTrack] = []
+        self._next_id = 0
+
+    def update(self, boxes: np.ndarray, scores: np.ndarray, frame_index: int) -> List[PlateTrack]:
+        """Match detections to tracks and return the track of every detection, in order"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        matched: List[Optional[PlateTrack]] = [None] * len(boxes)
+
+        if self.tracks and len(boxes):
+            ious = box_iou(boxes, np.stack([track.box for track in self.tracks]))
+            # Greedy assignment, best pairs first
+            used_tracks = set()
+            for flat in np.argsort(-ious, axis=None):
+                det, trk = np.unravel_index(flat, ious.shape)
+                if ious[det, trk] < self.iou_threshold:
+                    break
+                if matched[det] is not None or trk in used_tracks:
+                    continue
+                matched[det] = self.tracks[trk]
+                used_tracks.add(trk)
+
+        for det, (box, score) in enumerate(zip(boxes, scores)):
+            track = matched[det]
+            if track is None:
+                track = PlateTrack(self._next_id, box, score, frame_index)
+                self._next_id += 1
+                self.tracks.append(track)
+                matched[det] = track
+            track.box = box
+            track.score = float(score)
+            track.last_seen = frame_index
+
+        self.tracks = [track for track in self.tracks if frame_index - track.last_seen <= self.max_age]
+        return matched
+
+    @property
+    def tracks_created(self) -> int:
+        return self._next_id
+
+
+class AdaptiveFrameSkipper():
+    """
+    Decides how many source frames to drop so processing keeps up with the
+    source frame rate. Uses an exponential moving average of per-frame
+    processing time, capped at config.stream_max_skip.
+    """
+    def __init__(self, source_fps: float, config, smoothing: float = 0.2):
+        self.frame_interval = 1.0 / source_fps if source_fps > 0 else 0.0
+        self.max_skip = config.stream_max_skip
+        self.smoothing = smoothing
+        self.avg_latency = 0.0
+
+    def observe(self, latency: float):
+        if self.avg_latency == 0.0:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.smoothing * (latency - self.avg_latency)
+
+    @property
+    def skip(self) -> int:
+        if self.frame_interval == 0.0:
+            return 0
+        return min(self.max_skip, max(0, math.ceil(self.avg_latency / self.frame_interval) - 1))
+
+
+class StreamRecognizer():
+    """
+    Per-stream state for continuous plate reading.
+
+    Every processed frame runs the detector only; OCR runs for a track until it
+    has a reading with confidence >= config.ocr_confidence_threshold or
+    config.stream_ocr_attempts reads have been made, so a car waiting in view
+    is read once rather than once per frame.
+    """
+    def __init__(self, model, config):
+        self.model = model
+        self.config = config
+        self.tracker = PlateTracker(config)
+        self.confidence_threshold = config.ocr_confidence_threshold
+        self.max_ocr_attempts = config.stream_ocr_attempts
+        self.frames_processed = 0
+        self.ocr_calls = 0
+
+    def process(self, frame: np.ndarray, frame_index: int) -> dict:
+        boxes, scores = self.model.detect_batch([frame])[0]
+        tracks = self.tracker.update(boxes, scores, frame_index)
+
+        pending = [i for i, track in enumerate(tracks)
+                   if track.confidence < self.confidence_threshold
+                   and track.ocr_attempts < self.max_ocr_attempts]
+        new_plates = []
+        if pending:
+            crops = self.model.crop_plates(frame, boxes[pending])
+            texts, confidences = self.model.read_plates(crops)
+            self.ocr_calls += 1
+            for i, text, confidence in zip(pending, texts, confidences):
+                track = tracks[i]
+                track.ocr_attempts += 1
+                if track.text is None or confidence > track.confidence:
+                    if track.text != text:
+                        new_plates.append(track)
+                    track.text = text
+                    track.confidence = float(confidence)
+
+        self.frames_processed += 1
+        return {
+            'frame_index': frame_index,
+            'tracks': [track.to_dict() for track in tracks],
+            'new_plates': [track.to_dict() for track in new_plates],
+        }
+
+    def run(self, frames, source_fps: float = 0.0) -> Iterator[dict]:
+        """
+        Process a (frame_index, frame) iterator, skipping frames adaptively when
+        processing is slower than source_fps (0 processes every frame)
+        """
+        skipper = AdaptiveFrameSkipper(source_fps, self.config) if source_fps > 0 else None
+        to_skip = 0
+        skipped = 0
+        for frame_index, frame in frames:
+            if to_skip > 0:
+                to_skip -= 1
+                skipped += 1
+                continue
+            start = time.perf_counter()
+            event = self.process(frame, frame_index)
+            if skipper is not None:
+                skipper.observe(time.perf_counter() - start)
+                to_skip = skipper.skip
+            event['skipped_frames'] = skipped
+            yield event
+
+
+def main():
+    from config import Config
+    from .basemodel import Number_Plate_Recognizer
+
+    parser = argparse.ArgumentParser(description="Read number plates from a local video file")
+    parser.add_argument('video', help="Path to a video file (or any cv2.VideoCapture source)")
+    parser.add_argument('--stride', type=int, default=1, help="Only decode every n-th frame")
+    parser.add_argument('--realtime', action='store_true',
+                        help="Skip frames adaptively to keep up with the video's frame rate")
+    parser.add_argument('--config', default=None, help="Optional JSON/Python config file")
+    args = parser.parse_args()
+
+    config = Config(args.config)
+    model = Number_Plate_Recognizer(config)
+    stream = StreamRecognizer(model, config)
+
+    source_fps = 0.0
+    if args.realtime:
+        capture = cv2.VideoCapture(args.video)
+        source_fps = (capture.get(cv2.CAP_PROP_FPS) or 0.0) / args.stride
+        capture.release()
+
+    start = time.perf_counter()
+    for event in stream.run(read_frames(args.video, args.stride), source_fps):
+        for plate in event['new_plates']:
+            print(json.dumps({'frame_index': event['frame_index'], **plate}))
+    elapsed = time.perf_counter() - start
+
+    print(f"Processed {stream.frames_processed} frames in {elapsed:.2f}s "
+          f"({stream.frames_processed / elapsed if elapsed else 0:.1f} fps), "
+          f"{stream.tracker.tracks_created} tracks, {stream.ocr_calls} OCR calls")
+
+
+if __name__ == "__main__":
+    main()
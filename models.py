@@ -1,11 +1,42 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index, inspect
 from database import Base
 
 class History(Base):
-    __tablename__ = "history" 
-    
-    id = Column(Integer, primary_key=True, index=True)
-    number_plate = Column(String, index=True)
-    position = Column(String, index=True)
-    status = Column(String, index=True)
-    time = Column(DateTime, index=True)  
+    __tablename__ = "history"
+
+    id = Column(Integer, primary_key=True)
+    number_plate = Column(String)
+    position = Column(String)
+    status = Column(String)
+    time = Column(DateTime)
+    lot_id = Column(String, nullable=True)  # None for the default lot
+
+    # Matched to the /history queries, which page in (time, id) order: by plate, or
+    # by time range with status filtered on the way (a two-value status column does
+    # not narrow enough to earn its own index). SQLite appends the rowid id to every
+    # index, so both also serve the id tie-break.
+    __table_args__ = (
+        Index('ix_history_plate_time', 'number_plate', 'time'),
+        Index('ix_history_time', 'time'),
+    )
+
+
+# Single-column indexes created by earlier versions of the model; their ix_history_time is kept
+LEGACY_HISTORY_INDEXES = ('ix_history_id', 'ix_history_number_plate', 'ix_history_position',
+                          'ix_history_status')
+
+
+def migrate_history_table(engine):
+    """Bring an existing history table up to date: lot_id column, composite instead of legacy indexes"""
+    inspector = inspect(engine)
+    columns = {column['name'] for column in inspector.get_columns(History.__tablename__)}
+    existing = {index['name'] for index in inspector.get_indexes(History.__tablename__)}
+    with engine.begin() as connection:
+        if 'lot_id' not in columns:
+            connection.exec_driver_sql("ALTER TABLE history ADD COLUMN lot_id VARCHAR")
+        for name in LEGACY_HISTORY_INDEXES:
+            if name in existing:
+                connection.exec_driver_sql(f"DROP INDEX {name}")
+        for index in History.__table__.indexes:
+            if index.name not in existing:
+                index.create(connection)
@@ -1,3 +1,8 @@
-from .base_path_finder import PathFinder
+from .base_path_finder import PathFinder, PathFinderConfig
+from .lot_registry import LotRegistry, ParkingLot
+from .spot_allocator import SpotAllocator
+from .state_store import LotStateStore
+from .vehicle_index import VehicleAlreadyParked, VehicleIndex, normalize_plate
 
-__all__ = ['PathFinder']
\ No newline at end of file
+__all__ = ['PathFinder', 'PathFinderConfig', 'LotRegistry', 'ParkingLot', 'SpotAllocator', 'LotStateStore',
+           'VehicleAlreadyParked', 'VehicleIndex', 'normalize_plate']
@@ -1,48 +1,170 @@
-import numpy as np
 import heapq
-from collections import deque
+import numpy as np
+from collections import OrderedDict, deque
 from typing import List, Tuple, Optional
 
+from .spot_allocator import SpotAllocator
+
+# Cell states stored in PathFinder.status_matrix
+EMPTY = 0
+PARKED = 1
+OBSTACLE = 2
+PATH_ONLY = 3
+
+CELL_TYPE_NAMES = {EMPTY: 'empty', PARKED: 'parked', OBSTACLE: 'obstacle', PATH_ONLY: 'path'}
+
+# Distance of cells that cannot be reached from the entrance
+UNREACHABLE = -1
+
+
+def bfs_distances(passable: np.ndarray, sources, return_tree: bool = False):
+    """
+    4-directional multi-source BFS distances over a grid, expanding the whole frontier per step
+
+    Args:
+        passable: (W, H) bool array, False for cells vehicles cannot enter
+        sources: iterable of (x, y) start cells (distance 0)
+        return_tree: also return the BFS tree
+
+    Returns:
+        (W, H) int32 array of step counts to the nearest source, UNREACHABLE
+        where no path exists. With return_tree, also:
+            predecessors: (W, H) int32 flat index (x * H + y) of the previous
+                cell on a shortest path, -1 for the sources and unreachable cells
+            origins: (W, H) int16 index into sources of the nearest source, -1
+                where unreachable
+    """
+    width, height = passable.shape
+    passable_flat = passable.ravel()
+    distances = np.full(width * height, UNREACHABLE, dtype=np.int32)
+    predecessors = np.full(width * height, -1, dtype=np.int32)
+    origins = np.full(width * height, -1, dtype=np.int16)
+    slot = np.empty(width * height, dtype=np.int64)
+
+    starts = [(i, x * height + y) for i, (x, y) in enumerate(sources)
+              if 0 <= x < width and 0 <= y < height and passable[x, y]]
+    frontier = np.array([cell for _, cell in starts], dtype=np.int64)
+    distances[frontier] = 0
+    origins[frontier] = [i for i, _ in starts]
+
+    step = 0
+    while frontier.size:
+        step += 1
+        x = frontier // height
+        y = frontier - x * height
+        parents = [frontier[x > 0], frontier[y > 0], frontier[y < height - 1], frontier[x < width - 1]]
+        neighbors = np.concatenate([
+            parents[0] - height,  # (-1, 0)
+            parents[1] - 1,       # (0, -1)
+            parents[2] + 1,       # (0, 1)
+            parents[3] + height,  # (1, 0)
+        ])
+        parents = np.concatenate(parents)
+        keep = passable_flat[neighbors] & (distances[neighbors] == UNREACHABLE)
+        neighbors, parents = neighbors[keep], parents[keep]
+        # Drop duplicates (cells reached from two sides) without sorting: last write wins
+        order = np.arange(neighbors.size)
+        slot[neighbors] = order
+        first = slot[neighbors] == order
+        frontier = neighbors[first]
+        distances[frontier] = step
+        predecessors[frontier] = parents[first]
+        origins[frontier] = origins[parents[first]]
+
+    distances = distances.reshape(width, height)
+    if return_tree:
+        return distances, predecessors.reshape(width, height), origins.reshape(width, height)
+    return distances
+
+
 class PathFinder:
-    def __init__(self, config):
+    def __init__(self, config, store=None):
         """
         Initialize the PathFinder with configuration
         
         Args:
+            store: optional LotStateStore; the saved statuses replace the configured
+                map and every later status change is logged to it
             config: Configuration object containing:
                 - map_size: tuple (width, height) of the parking lot
                 - initial_pos: tuple (x, y) starting position (entrance)
+                - entrances: optional list of further (x, y) entrances
                 - obstacles: list of (x, y) positions that are blocked
                 - paths: list of (x,y) positions that not allow to park but allow vehicle to move through
+                - zones: optional dict of zone name -> (x0, y0, x1, y1) inclusive rectangle
         """
-        self.map_size = config.map_size  # (width, height)
-        self.initial_pos = config.initial_pos
+        self.map_size = tuple(config.map_size)  # (width, height)
+        self.initial_pos = tuple(config.initial_pos)
+        
+        # Entrance ids are indices into this list; 0 is initial_pos
+        self.entrances = [self.initial_pos]
+        for position in getattr(config, 'entrances', None) or []:
+            if tuple(position) not in self.entrances and self._is_valid_position(*position):
+                self.entrances.append(tuple(position))
+        self._entrance_cells = {x * self.map_size[1] + y: i for i, (x, y) in enumerate(self.entrances)}
+        
+        # Named rectangles batch allocations can be confined to
+        self.zones = {name: tuple(int(v) for v in rect)
+                      for name, rect in (getattr(config, 'zones', None) or {}).items()}
+        
+        # Occupancy counters by distance band (distance // distance_band_size) and by zone
+        self.distance_band_size = getattr(config, 'distance_band_size', 10)
+        
+        # Distances from the nearest entrance (int32, UNREACHABLE where no path exists)
+        self.distance_matrix = np.full(self.map_size, UNREACHABLE, dtype=np.int32)
         
-        # Initialize 2D matrix for distances
-        self.distance_matrix = [[float('inf') for _ in range(self.map_size[1])] 
-                               for _ in range(self.map_size[0])]
+        # Previous cell on a shortest path, as a flat x * height + y index (-1 for none)
+        self.predecessor_matrix = np.full(self.map_size, -1, dtype=np.int32)
+        
+        # Id of the nearest entrance (int16, -1 where unreachable)
+        self.entrance_matrix = np.full(self.map_size, -1, dtype=np.int16)
         
         # Status matrix: 0=empty, 1=parked, 2=obstacle, 3=path_only
-        self.status_matrix = [[0 for _ in range(self.map_size[1])] 
-                             for _ in range(self.map_size[0])]
+        self.status_matrix = np.zeros(self.map_size, dtype=np.int8)
+        
+        # Track positions
+        self.parked_positions = {}  # Parked (x, y) -> None, in parking order
+        # Empty reachable spots by (distance, x, y), one allocator per nearest entrance
+        self.entrance_spots = [SpotAllocator(self.map_size) for _ in self.entrances]
+        
+        # Reachable cells per status (empty, parked, obstacle, path_only), overall,
+        # per distance band and per zone; see _count_cell
+        self.status_counts = [0, 0, 0, 0]
+        self.band_counts = []
+        self.zone_counts = {name: [0, 0, 0, 0] for name in self.zones}
+        self._zone_counters = [(self.zones[name], counts) for name, counts in self.zone_counts.items()]
+        
+        # Map edits touching more cells than this are cheaper as a full vectorized rebuild
+        self.incremental_limit = max(1024, self.map_size[0] * self.map_size[1] // 64)
+        
+        # Routes by target position, dropped whenever the map changes
+        self.route_cache_size = getattr(config, 'route_cache_size', 1024)
+        self._route_cache = OrderedDict()
+        self.map_version = 0
         
-        # Lists to track positions
-        self.parked_list = []  # List of parked positions
-        self.blank_pos_list = []  # Min-heap of (distance, position) for empty spots
+        # Cells whose nearest entrance changed during an edit, see _propagate_entrances
+        self._relabeled = []
         
         # Set obstacles if provided
         if hasattr(config, 'obstacles') and config.obstacles:
-            for obs_x, obs_y in config.obstacles:
-                if self._is_valid_position(obs_x, obs_y):
-                    self.status_matrix[obs_x][obs_y] = 2
+            self._fill_cells(config.obstacles, OBSTACLE)
                 
         # Set path-only positions if provided
         if hasattr(config, 'paths') and config.paths:
-            for x, y in config.paths:
-                if self._is_valid_position(x, y):
-                    self.status_matrix[x][y] = 3
-        
-        # Calculate distances from initial position using BFS
+            self._fill_cells(config.paths, PATH_ONLY)
+        
+        # Restore parked vehicles and runtime map edits saved before a restart
+        self.store = None
+        if store is not None:
+            recovered = store.recover(self.map_size)
+            if recovered is not None:
+                self.status_matrix = recovered
+                parked = np.argwhere(recovered == PARKED).tolist()
+                self.parked_positions = dict.fromkeys(tuple(position) for position in parked)
+            store.attach(self.status_matrix)
+            self.store = store
+        
+        # Calculate distances from the entrances using BFS
         self._calculate_distances()
         self._update_blank_positions()
     
@@ -50,66 +172,492 @@ class PathFinder:
         """Check if position is within map boundaries"""
         return 0 <= x < self.map_size[0] and 0 <= y < self.map_size[1]
     
+    def _fill_cells(self, positions, status: int):
+        """Set the status of every in-bounds (x, y) in positions"""
+        cells = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        inside = ((cells >= 0) & (cells < self.map_size)).all(axis=1)
+        self.status_matrix[cells[inside, 0], cells[inside, 1]] = status
+    
     def _calculate_distances(self):
-        """Calculate shortest distances from initial position using BFS"""
-        queue = deque([(self.initial_pos[0], self.initial_pos[1], 0)])
-        visited = [[False for _ in range(self.map_size[1])] 
-                  for _ in range(self.map_size[0])]
+        """Calculate shortest distances from the nearest entrance using a multi-source BFS"""
+        # Movement through path-only cells is allowed, obstacles block it
+        self.distance_matrix, self.predecessor_matrix, self.entrance_matrix = bfs_distances(
+            self.status_matrix != OBSTACLE, self.entrances, return_tree=True)
+    
+    def _scan_counts(self):
+        """Status counts overall, per distance band and per zone, from a full scan of the grids"""
+        reachable = self.distance_matrix != UNREACHABLE
+        statuses = self.status_matrix[reachable].astype(np.int64)
+        bands = self.distance_matrix[reachable] // self.distance_band_size
+        status_counts = np.bincount(statuses, minlength=4).tolist()
+        band_count = int(bands.max()) + 1 if bands.size else 0
+        band_counts = np.bincount(bands * 4 + statuses, minlength=4 * band_count).reshape(-1, 4).tolist()
+        zone_counts = {}
+        for name, (x0, y0, x1, y1) in self.zones.items():
+            window = (slice(max(x0, 0), x1 + 1), slice(max(y0, 0), y1 + 1))
+            zone_counts[name] = np.bincount(self.status_matrix[window][reachable[window]], minlength=4).tolist()
+        return status_counts, band_counts, zone_counts
+    
+    def _update_blank_positions(self):
+        """Rebuild the free-spot allocator and the occupancy counters from the grids"""
+        reachable = self.distance_matrix != UNREACHABLE
+        self.status_counts, self.band_counts, zone_counts = self._scan_counts()
+        for name, counts in zone_counts.items():
+            self.zone_counts[name][:] = counts
+        
+        # Only include positions that are empty (0), reachable and not an entrance
+        mask = (self.status_matrix == EMPTY) & reachable
+        for position in self.entrances:
+            mask[position] = False
+        xs, ys = np.nonzero(mask)
+        nearest = self.entrance_matrix[xs, ys]
+        self.entrance_spots = []
+        for entrance in range(len(self.entrances)):
+            selected = nearest == entrance
+            self.entrance_spots.append(SpotAllocator.from_arrays(
+                self.map_size, xs[selected], ys[selected], self.distance_matrix[xs[selected], ys[selected]]))
+    
+    def _is_spot(self, x: int, y: int) -> bool:
+        """Whether an empty (x, y) belongs in a free-spot allocator"""
+        return (self.distance_matrix[x, y] != UNREACHABLE and
+                x * self.map_size[1] + y not in self._entrance_cells)
+    
+    def _neighbor_cells(self, cell: int):
+        """Flat indices of the 4-neighbours of a flat (x * height + y) cell index"""
+        width, height = self.map_size
+        x, y = divmod(cell, height)
+        if x > 0:
+            yield cell - height
+        if y > 0:
+            yield cell - 1
+        if y < height - 1:
+            yield cell + 1
+        if x < width - 1:
+            yield cell + height
+    
+    def _count_cell(self, x: int, y: int, status: int, distance: int, delta: int):
+        """Add delta to every counter a reachable cell with this status and distance falls in"""
+        self.status_counts[status] += delta
+        band = distance // self.distance_band_size
+        while band >= len(self.band_counts):
+            self.band_counts.append([0, 0, 0, 0])
+        self.band_counts[band][status] += delta
+        for (x0, y0, x1, y1), counts in self._zone_counters:
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                counts[status] += delta
+    
+    def _set_status(self, x: int, y: int, status: int):
+        """Change a cell's status, keeping the counters and the allocator in sync"""
+        old = self.status_matrix[x, y]
+        self.status_matrix[x, y] = status
+        if self.store is not None:
+            self.store.append(x, y, status)
+        distance = int(self.distance_matrix[x, y])
+        if distance == UNREACHABLE:
+            return
+        # Same cell, same band and zones: move one count from old to status in each
+        for counts in (self.status_counts, self.band_counts[distance // self.distance_band_size]):
+            counts[old] -= 1
+            counts[status] += 1
+        for (x0, y0, x1, y1), counts in self._zone_counters:
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                counts[old] -= 1
+                counts[status] += 1
+        spots = self.entrance_spots[self.entrance_matrix[x, y]]
+        if old == EMPTY:
+            spots.remove((x, y))
+        elif status == EMPTY and self._is_spot(x, y):
+            spots.add((x, y), int(self.distance_matrix[x, y]))
+    
+    def _set_distance(self, cell: int, distance: int, predecessor: int = -1):
+        """
+        Change a cell's distance and predecessor, keeping the counters and the allocators in sync
+        
+        The nearest entrance is inherited from the predecessor; cells whose
+        entrance changed are queued for _propagate_entrances.
+        """
+        x, y = divmod(cell, self.map_size[1])
+        if predecessor >= 0:
+            origin = int(self.entrance_matrix.flat[predecessor])
+        else:
+            origin = self._entrance_cells.get(cell, -1) if distance == 0 else -1
+        old, old_origin = int(self.distance_matrix[x, y]), int(self.entrance_matrix[x, y])
+        self.predecessor_matrix[x, y] = predecessor
+        if old == distance and old_origin == origin:
+            return
+        self.distance_matrix[x, y] = distance
+        self.entrance_matrix[x, y] = origin
+        if origin != old_origin and origin >= 0:
+            self._relabeled.append(cell)
+        
+        status = self.status_matrix[x, y]
+        if old != distance:
+            if old != UNREACHABLE:
+                self._count_cell(x, y, status, old, -1)
+            if distance != UNREACHABLE:
+                self._count_cell(x, y, status, distance, 1)
+        if status != EMPTY or cell in self._entrance_cells:
+            return
+        if old != UNREACHABLE and origin != old_origin:
+            self.entrance_spots[old_origin].remove((x, y))
+        if distance == UNREACHABLE:
+            return
+        if old == UNREACHABLE or origin != old_origin:
+            self.entrance_spots[origin].add((x, y), distance)
+        else:
+            self.entrance_spots[origin].update((x, y), distance)
+    
+    def _propagate_entrances(self) -> int:
+        """
+        Push nearest-entrance ids down the BFS tree below relabeled cells
         
-        # 8-directional movement (including diagonals)
-        directions = [(-1, 0),(0, -1),(0, 1),(1, 0)]
+        Distances are already correct at this point; only the subtrees of
+        cells that switched entrance are walked. Returns the number of cells updated.
+        """
+        distances = memoryview(self.distance_matrix.ravel())
+        predecessors = memoryview(self.predecessor_matrix.ravel())
+        entrances = memoryview(self.entrance_matrix.ravel())
+        queue = deque(self._relabeled)
+        self._relabeled = []
+        updated = 0
+        while queue:
+            v = queue.popleft()
+            for w in self._neighbor_cells(v):
+                if predecessors[w] == v and entrances[w] != entrances[v]:
+                    self._set_distance(w, distances[w], v)
+                    queue.append(w)
+                    updated += 1
+            if updated > self.incremental_limit:
+                return updated + self._rebuild()
+        self._relabeled = []
+        return updated
+    
+    def _rebuild(self) -> int:
+        """Recompute all distances and the allocator; returns the number of distances that changed"""
+        old = self.distance_matrix
+        self._calculate_distances()
+        self._update_blank_positions()
+        self._relabeled = []
+        return int(np.count_nonzero(old != self.distance_matrix))
+    
+    def _block_cell(self, cell: int) -> int:
+        """
+        Update distances after a passable cell became an obstacle
         
+        Only cells whose every shortest path went through the blocked cell are
+        invalidated; they are re-seeded from their valid neighbours and settled
+        again in distance order. Falls back to _rebuild past incremental_limit
+        cells. Returns the number of cells whose distance changed.
+        """
+        # memoryviews index as plain ints, much faster than numpy scalars in these loops
+        distances = memoryview(self.distance_matrix.ravel())
+        predecessors = memoryview(self.predecessor_matrix.ravel())
+        start = distances[cell]
+        self._set_distance(cell, UNREACHABLE)
+        if start == UNREACHABLE:
+            return 1
+        
+        # Walk the shortest-path DAG below the cell level by level; a cell stays
+        # valid while one neighbour one step closer to the entrance is still valid
+        invalid = {cell}
+        queue = deque(n for n in self._neighbor_cells(cell) if distances[n] == start + 1)
+        seen = set(queue)
         while queue:
-            x, y, dist = queue.popleft()
-            
-            # Skip if already visited or invalid position
-            if not self._is_valid_position(x, y) or visited[x][y]:
+            v = queue.popleft()
+            level = distances[v]
+            if predecessors[v] not in invalid:
                 continue
-            
-            # Skip if it's an obstacle (but allow path-only positions for movement)
-            if self.status_matrix[x][y] == 2:
+            support = next((w for w in self._neighbor_cells(v)
+                            if distances[w] == level - 1 and w not in invalid), None)
+            if support is not None:
+                self._set_distance(v, level, support)
                 continue
-            
-            visited[x][y] = True
-            self.distance_matrix[x][y] = dist
-            
-            # Add neighbors to queue
-            for dx, dy in directions:
-                new_x, new_y = x + dx, y + dy
-                if (self._is_valid_position(new_x, new_y) and 
-                    not visited[new_x][new_y] and 
-                    self.status_matrix[new_x][new_y] != 2):  # Allow movement through paths
-                    queue.append((new_x, new_y, dist + 1))
+            invalid.add(v)
+            for u in self._neighbor_cells(v):
+                if distances[u] == level + 1 and u not in seen:
+                    seen.add(u)
+                    queue.append(u)
+            if len(seen) > self.incremental_limit:
+                return self._rebuild()
+        invalid.discard(cell)
+        
+        # Re-seed invalidated cells from the valid boundary and settle them in distance order
+        heap = []
+        for v in invalid:
+            boundary = [(distances[w], w) for w in self._neighbor_cells(v)
+                        if w not in invalid and distances[w] != UNREACHABLE]
+            if boundary:
+                d, w = min(boundary)
+                heap.append((d + 1, v, w))
+        heapq.heapify(heap)
+        settled = {}
+        while heap:
+            d, v, w = heapq.heappop(heap)
+            if v in settled:
+                continue
+            settled[v] = (d, w)
+            for u in self._neighbor_cells(v):
+                if u in invalid and u not in settled:
+                    heapq.heappush(heap, (d + 1, u, v))
+        
+        # Parents before children, so each cell inherits a final nearest entrance
+        for v, (d, w) in settled.items():
+            self._set_distance(v, d, w)
+        for v in invalid.difference(settled):
+            self._set_distance(v, UNREACHABLE)
+        return len(invalid) + 1
     
-    def _update_blank_positions(self):
-        """Update the heap of blank positions"""
-        self.blank_pos_list = []
+    def _open_cell(self, cell: int) -> int:
+        """
+        Update distances after an obstacle was cleared
+        
+        Distances can only shrink, so a BFS from the opened cell that stops at
+        cells which are already as close is enough. Falls back to _rebuild past
+        incremental_limit cells. Returns the number of cells whose distance changed.
+        """
+        distances = memoryview(self.distance_matrix.ravel())
+        statuses = memoryview(self.status_matrix.ravel())
+        reachable = [(distances[w], w) for w in self._neighbor_cells(cell) if distances[w] != UNREACHABLE]
+        if cell in self._entrance_cells:
+            self._set_distance(cell, 0)
+        elif reachable:
+            d, w = min(reachable)
+            self._set_distance(cell, d + 1, w)
+        else:
+            return 0
+        
+        changed = 1
+        queue = deque([cell])
+        while queue:
+            v = queue.popleft()
+            d = distances[v] + 1
+            for u in self._neighbor_cells(v):
+                if statuses[u] != OBSTACLE and (distances[u] == UNREACHABLE or distances[u] > d):
+                    self._set_distance(u, d, v)
+                    changed += 1
+                    if changed > self.incremental_limit:
+                        return changed + self._rebuild()
+                    queue.append(u)
+        return changed
+    
+    def set_cell_type(self, position: Tuple[int, int], status: int) -> bool:
+        """
+        Change a cell to empty (0), obstacle (2) or path-only (3) at runtime
+        
+        Distances are repaired incrementally around the cell and the free-spot
+        allocator is updated in place, instead of rebuilding the whole lot.
+        
+        Args:
+            position: tuple (x, y) of the cell
+            status: EMPTY, OBSTACLE or PATH_ONLY
+            
+        Returns:
+            bool: True if the cell has the requested type, False if the change is not allowed
+        """
+        x, y = position
+        
+        if not self._is_valid_position(x, y):
+            print(f"Invalid position: ({x}, {y})")
+            return False
+        
+        if status not in (EMPTY, OBSTACLE, PATH_ONLY):
+            print(f"Invalid cell type: {status}")
+            return False
+        
+        current = self.status_matrix[x, y]
+        if current == PARKED:
+            print(f"Position ({x}, {y}) has a parked vehicle")
+            return False
+        
+        if status == OBSTACLE and (x, y) in self.entrances:
+            print(f"Position ({x}, {y}) is the entrance and cannot be blocked")
+            return False
         
-        for x in range(self.map_size[0]):
-            for y in range(self.map_size[1]):
-                # Only include positions that are empty (0) and not path-only (3)
-                if (self.status_matrix[x][y] == 0 and  # Empty and parkable
-                    self.distance_matrix[x][y] != float('inf') and  # Reachable
-                    (x, y) != self.initial_pos):  # Not the entrance
-                    heapq.heappush(self.blank_pos_list, 
-                                 (self.distance_matrix[x][y], [x, y]))
+        if current == status:
+            return True
+        
+        self._set_status(x, y, status)
+        cell = x * self.map_size[1] + y
+        if status == OBSTACLE:
+            changed = self._block_cell(cell)
+        elif current == OBSTACLE:
+            changed = self._open_cell(cell)
+        else:
+            changed = 0
+        if self._relabeled:
+            changed += self._propagate_entrances()
+        
+        if changed:
+            self.map_version += 1
+            self._route_cache.clear()
+        
+        print(f"Position ({x}, {y}) changed to {CELL_TYPE_NAMES[status]}, {changed} distances updated")
+        return True
+    
+    def add_obstacle(self, position: Tuple[int, int]) -> bool:
+        return self.set_cell_type(position, OBSTACLE)
+    
+    def remove_obstacle(self, position: Tuple[int, int]) -> bool:
+        if self.status_matrix[position[0], position[1]] != OBSTACLE:
+            return False
+        return self.set_cell_type(position, EMPTY)
+    
+    def add_path(self, position: Tuple[int, int]) -> bool:
+        return self.set_cell_type(position, PATH_ONLY)
     
-    def find_shortest_blank_position(self) -> Optional[Tuple[int, int]]:
+    def remove_path(self, position: Tuple[int, int]) -> bool:
+        if self.status_matrix[position[0], position[1]] != PATH_ONLY:
+            return False
+        return self.set_cell_type(position, EMPTY)
+    
+    @property
+    def parked_list(self) -> List[Tuple[int, int]]:
+        """Parked positions, oldest first"""
+        return list(self.parked_positions)
+    
+    @property
+    def free_spots(self) -> int:
+        """Number of empty spots that can be allocated"""
+        return sum(len(spots) for spots in self.entrance_spots)
+    
+    def find_shortest_blank_position(self, entrance: Optional[int] = None) -> Optional[Tuple[int, int]]:
         """
         Find the closest empty parking position
         
+        Args:
+            entrance: optional entrance id; prefers the closest spot among those
+                nearest to that entrance, falling back to the closest spot overall
+        
         Returns:
             tuple: (x, y) coordinates of the closest empty spot, or None if no spots available
         """
-        while self.blank_pos_list:
-            distance, position = heapq.heappop(self.blank_pos_list)
-            x, y = position
-            
-            # Check if this position is still empty and parkable
-            if self.status_matrix[x][y] == 0:
-                return (x, y)
+        if entrance is not None or len(self.entrance_spots) == 1:
+            position = self.entrance_spots[entrance or 0].peek()
+            if position is not None or len(self.entrance_spots) == 1:
+                return position
+        
+        best = None
+        for spots in self.entrance_spots:
+            position = spots.peek()
+            if position is not None and (best is None or (spots.distance(position), position) < best):
+                best = (spots.distance(position), position)
+        return best[1] if best else None
+    
+    def allocate_spot(self, entrance: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """
+        Park at the closest empty spot in one step (see find_shortest_blank_position)
+        
+        Not thread-safe by itself: when threads share a PathFinder, call it
+        under the lot lock (ParkingLot.allocate) so no two callers get the same spot.
+        
+        Returns:
+            tuple: (x, y) of the reserved spot, or None if no spots available
+        """
+        position = self.find_shortest_blank_position(entrance)
+        if position is None or not self.park_vehicle(position):
+            return None
+        return position
+    
+    def _spot_keys(self, zone: Optional[str] = None, entrance: Optional[int] = None):
+        """
+        Flat indices and ordering keys of the free spots, optionally inside one zone
+        
+        Keys pack (not nearest to entrance, distance, flat index) into one int64,
+        the order find_shortest_blank_position picks spots in.
+        """
+        width, height = self.map_size
+        mask = (self.status_matrix == EMPTY) & (self.distance_matrix != UNREACHABLE)
+        for position in self.entrances:
+            mask[position] = False
+        if zone is not None:
+            x0, y0, x1, y1 = self.zones[zone]
+            inside = np.zeros_like(mask)
+            inside[max(x0, 0):x1 + 1, max(y0, 0):y1 + 1] = True
+            mask &= inside
+        cells = np.flatnonzero(mask)
+        cell_count = width * height
+        keys = self.distance_matrix.ravel()[cells].astype(np.int64) * cell_count + cells
+        if entrance is not None:
+            keys += (self.entrance_matrix.ravel()[cells] != entrance) * (cell_count * cell_count)
+        return mask.ravel(), cells, keys
+    
+    def _adjacent_spots(self, count: int, mask: np.ndarray, cells: np.ndarray, keys: np.ndarray):
+        """
+        count free spots forming one 4-connected group, grown from the best seed that has room
+        
+        Seeds are tried in key order; a group grows by always taking its best
+        neighbouring free spot. A seed whose group runs out before count spots
+        leaves its whole component marked visited, so every spot is expanded
+        at most once.
+        """
+        cell_count = self.map_size[0] * self.map_size[1]
+        key_of = np.zeros(cell_count, dtype=np.int64)
+        key_of[cells] = keys
+        key_of = memoryview(key_of)
+        free = memoryview(mask.view(np.uint8))
+        visited = set()
+        
+        # Usually the first seeds succeed, so only the best few are sorted up front
+        first = min(cells.size, max(64, 4 * count))
+        head = np.argpartition(keys, first - 1)[:first] if first < cells.size else np.arange(cells.size)
+        head = head[np.argsort(keys[head])]
+        rest = np.setdiff1d(np.arange(cells.size), head, assume_unique=True)
+        seeds = np.concatenate([head, rest[np.argsort(keys[rest])]])
+        
+        for seed in cells[seeds].tolist():
+            if seed in visited:
+                continue
+            visited.add(seed)
+            group, frontier = [], [key_of[seed]]
+            while frontier and len(group) < count:
+                cell = heapq.heappop(frontier) % cell_count
+                group.append(cell)
+                for neighbor in self._neighbor_cells(cell):
+                    if free[neighbor] and neighbor not in visited:
+                        visited.add(neighbor)
+                        heapq.heappush(frontier, key_of[neighbor])
+            if len(group) == count:
+                return group
+        return None
+    
+    def allocate_spots(self, count: int, entrance: Optional[int] = None, adjacent: bool = False,
+                       zone: Optional[str] = None) -> Optional[List[Tuple[int, int]]]:
+        """
+        Park count vehicles at once, all or nothing
+        
+        Without constraints this is count allocate_spot calls. With a zone,
+        only spots inside that rectangle are used; with adjacent, the spots
+        form one 4-connected group. Spots are picked closest first, preferring
+        those nearest to entrance when given.
+        
+        Not thread-safe by itself: call it under the lot lock (ParkingLot.allocate_many).
         
-        return None  # No empty spots available
+        Returns:
+            list: (x, y) of the reserved spots, or None if the request cannot be met
+                (nothing is reserved then); raises KeyError for an unknown zone
+        """
+        if count <= 0:
+            return []
+        if zone is None and not adjacent:
+            if count > self.free_spots:
+                return None
+            return [self.allocate_spot(entrance) for _ in range(count)]
+        
+        mask, cells, keys = self._spot_keys(zone, entrance)
+        if count > cells.size:
+            return None
+        if adjacent:
+            group = self._adjacent_spots(count, mask, cells, keys)
+            if group is None:
+                return None
+        else:
+            group = cells[np.argpartition(keys, count - 1)[:count]] if count < cells.size else cells
+        
+        group = sorted(group, key=lambda cell: keys[np.searchsorted(cells, cell)])
+        positions = [divmod(int(cell), self.map_size[1]) for cell in group]
+        for position in positions:
+            self.park_vehicle(position)
+        return positions
     
     def park_vehicle(self, position: Tuple[int, int]) -> bool:
         """
@@ -127,16 +675,16 @@ class PathFinder:
             print(f"Invalid position: ({x}, {y})")
             return False
         
-        if self.status_matrix[x][y] != 0:
-            if self.status_matrix[x][y] == 3:
+        if self.status_matrix[x, y] != EMPTY:
+            if self.status_matrix[x, y] == PATH_ONLY:
                 print(f"Position ({x}, {y}) is a path-only area, parking not allowed")
             else:
                 print(f"Position ({x}, {y}) is not empty")
             return False
         
         # Park the vehicle
-        self.status_matrix[x][y] = 1
-        self.parked_list.append((x, y))
+        self._set_status(x, y, PARKED)
+        self.parked_positions[(x, y)] = None
         
         print(f"Vehicle parked at position ({x}, {y})")
         return True
@@ -157,26 +705,23 @@ class PathFinder:
             print(f"Invalid position: ({x}, {y})")
             return False
         
-        if self.status_matrix[x][y] != 1:
+        if self.status_matrix[x, y] != PARKED:
             print(f"No vehicle parked at position ({x}, {y})")
             return False
         
-        # Remove the vehicle
-        self.status_matrix[x][y] = 0
-        if (x, y) in self.parked_list:
-            self.parked_list.remove((x, y))
-        
-        # Add back to blank positions heap if reachable
-        if self.distance_matrix[x][y] != float('inf'):
-            heapq.heappush(self.blank_pos_list, 
-                         (self.distance_matrix[x][y], [x, y]))
+        # Remove the vehicle, freeing the spot again if reachable
+        self._set_status(x, y, EMPTY)
+        self.parked_positions.pop((x, y), None)
         
         print(f"Vehicle removed from position ({x}, {y})")
         return True
     
     def get_path_to_position(self, target_pos: Tuple[int, int]) -> List[Tuple[int, int]]:
         """
-        Get the shortest path from initial position to target position
+        Get the shortest path from the nearest entrance to target position
+        
+        Follows the BFS predecessors back from the target, so every step is a
+        4-directional move and the cost is O(path length).
         
         Args:
             target_pos: tuple (x, y) destination
@@ -188,55 +733,37 @@ class PathFinder:
             return []
         
         # Check if target is reachable
-        if self.distance_matrix[target_pos[0]][target_pos[1]] == float('inf'):
+        if self.distance_matrix[target_pos[0], target_pos[1]] == UNREACHABLE:
             return []
         
+        height = self.map_size[1]
+        predecessors = memoryview(self.predecessor_matrix.ravel())
+        cell = target_pos[0] * height + target_pos[1]
         path = []
-        current = target_pos
         
-        # Backtrack from target to initial position
-        while current != self.initial_pos:
-            path.append(current)
-            x, y = current
-            current_dist = self.distance_matrix[x][y]
-            
-            # Find the neighbor with the smallest distance that leads toward start
-            best_neighbor = None
-            min_dist = float('inf')
-            
-            directions = [
-                (-1, -1), (-1, 0), (-1, 1),
-                (0, -1),           (0, 1),
-                (1, -1),  (1, 0),  (1, 1)
-            ]
-            
-            for dx, dy in directions:
-                new_x, new_y = x + dx, y + dy
-                if (self._is_valid_position(new_x, new_y) and
-                    self.distance_matrix[new_x][new_y] < current_dist and
-                    self.distance_matrix[new_x][new_y] < min_dist):
-                    min_dist = self.distance_matrix[new_x][new_y]
-                    best_neighbor = (new_x, new_y)
-            
-            if best_neighbor is None:
-                # Fallback: try to find any reachable neighbor with smaller distance
-                for dx, dy in directions:
-                    new_x, new_y = x + dx, y + dy
-                    if (self._is_valid_position(new_x, new_y) and
-                        self.distance_matrix[new_x][new_y] != float('inf') and
-                        self.distance_matrix[new_x][new_y] < current_dist):
-                        best_neighbor = (new_x, new_y)
-                        break
-                
-                if best_neighbor is None:
-                    return []  # No valid path found
-            
-            current = best_neighbor
+        # Backtrack from target to its nearest entrance
+        while cell >= 0:
+            path.append(divmod(cell, height))
+            cell = predecessors[cell]
         
-        path.append(self.initial_pos)
         path.reverse()
         return path
     
+    def get_route(self, target_pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """get_path_to_position through an LRU cache that map edits invalidate"""
+        target_pos = (int(target_pos[0]), int(target_pos[1]))
+        route = self._route_cache.get(target_pos)
+        if route is not None:
+            self._route_cache.move_to_end(target_pos)
+            return route
+        
+        route = self.get_path_to_position(target_pos)
+        if self.route_cache_size > 0:
+            self._route_cache[target_pos] = route
+            if len(self._route_cache) > self.route_cache_size:
+                self._route_cache.popitem(last=False)
+        return route
+    
     def get_parking_status(self) -> dict:
         """
         Get current parking lot status
@@ -244,24 +771,11 @@ class PathFinder:
         Returns:
             dict: Status information including total spots, parked, empty, etc.
         """
-        total_parkable_spots = 0
-        empty_spots = 0
-        parked_spots = len(self.parked_list)
-        obstacle_spots = 0
-        path_only_spots = 0
-        
-        for x in range(self.map_size[0]):
-            for y in range(self.map_size[1]):
-                if self.distance_matrix[x][y] != float('inf'):  # Reachable positions
-                    if self.status_matrix[x][y] == 0:
-                        total_parkable_spots += 1
-                        empty_spots += 1
-                    elif self.status_matrix[x][y] == 1:
-                        total_parkable_spots += 1
-                    elif self.status_matrix[x][y] == 2:
-                        obstacle_spots += 1
-                    elif self.status_matrix[x][y] == 3:
-                        path_only_spots += 1
+        empty_spots = self.status_counts[EMPTY]
+        parked_spots = len(self.parked_positions)
+        total_parkable_spots = empty_spots + self.status_counts[PARKED]
+        obstacle_spots = self.status_counts[OBSTACLE]
+        path_only_spots = self.status_counts[PATH_ONLY]
         
         return {
             'total_parkable_spots': total_parkable_spots,
@@ -272,6 +786,51 @@ class PathFinder:
             'occupancy_rate': parked_spots / total_parkable_spots if total_parkable_spots > 0 else 0
         }
     
+    def get_occupancy(self) -> dict:
+        """
+        Occupancy overall, per zone and per distance band, read from the live counters
+        
+        Every counter is updated in O(1) by each park, unpark and map edit, so
+        this costs the same on any lot size. Bands with no parkable spots are left out.
+        """
+        def summary(counts):
+            total = counts[EMPTY] + counts[PARKED]
+            return {
+                'total_parkable_spots': total,
+                'empty_spots': counts[EMPTY],
+                'parked_spots': counts[PARKED],
+                'occupancy_rate': counts[PARKED] / total if total > 0 else 0
+            }
+        
+        size = self.distance_band_size
+        return {
+            **summary(self.status_counts),
+            'zones': {name: summary(counts) for name, counts in self.zone_counts.items()},
+            'distance_bands': [{'min_distance': band * size, 'max_distance': (band + 1) * size - 1, **summary(counts)}
+                               for band, counts in enumerate(self.band_counts) if counts[EMPTY] or counts[PARKED]]
+        }
+    
+    def check_counters(self) -> List[str]:
+        """
+        Compare the live occupancy counters with a full scan of the grids
+        
+        Returns:
+            list: one message per counter that disagrees; empty when all are consistent
+        """
+        status_counts, band_counts, zone_counts = self._scan_counts()
+        errors = []
+        if self.status_counts != status_counts:
+            errors.append(f"status counts {self.status_counts} != scanned {status_counts}")
+        live_bands = list(self.band_counts)
+        while live_bands and not any(live_bands[-1]):
+            live_bands.pop()  # Bands emptied by edits stay allocated
+        if live_bands != band_counts:
+            errors.append(f"distance band counts {live_bands} != scanned {band_counts}")
+        for name, counts in zone_counts.items():
+            if self.zone_counts[name] != counts:
+                errors.append(f"zone '{name}' counts {self.zone_counts[name]} != scanned {counts}")
+        return errors
+    
     def visualize_map(self) -> str:
         """
         Create a text visualization of the parking lot
@@ -279,24 +838,14 @@ class PathFinder:
         Returns:
             str: Text representation of the map
         """
-        visualization = []
-        
-        for y in range(self.map_size[1]):
-            row = []
-            for x in range(self.map_size[0]):
-                if (x, y) == self.initial_pos:
-                    row.append('S')  # Start position
-                elif self.status_matrix[x][y] == 1:
-                    row.append('P')  # Parked
-                elif self.status_matrix[x][y] == 2:
-                    row.append('X')  # Obstacle
-                elif self.status_matrix[x][y] == 3:
-                    row.append('R')  # Road/Path only
-                elif self.distance_matrix[x][y] == float('inf'):
-                    row.append('#')  # Unreachable
-                else:
-                    row.append('.')  # Empty parkable spot
-            visualization.append(' '.join(row))
+        symbols = np.array(['.', 'P', 'X', 'R'])
+        grid = symbols[self.status_matrix]
+        grid[(self.distance_matrix == UNREACHABLE) & (self.status_matrix == EMPTY)] = '#'  # Unreachable
+        for position in self.entrances:
+            grid[position] = 'S'  # Start position
+        
+        # One text row per y, as before
+        visualization = [' '.join(row) for row in grid.T]
         
         legend = "\nLegend: S=Start, P=Parked, X=Obstacle, R=Road/Path, #=Unreachable, .=Empty"
         return '\n'.join(visualization) + legend
@@ -306,9 +855,15 @@ class PathFinder:
 class PathFinderConfig:
     def __init__(self, map_size: Tuple[int, int], initial_pos: Tuple[int, int], 
                  obstacles: List[Tuple[int, int]] = None, 
-                 paths: List[Tuple[int, int]] = None):
+                 paths: List[Tuple[int, int]] = None,
+                 entrances: List[Tuple[int, int]] = None,
+                 zones: dict = None,
+                 distance_band_size: int = 10):
         self.map_size = map_size
         self.initial_pos = initial_pos
+        self.entrances = entrances or []
+        self.zones = zones or {}
+        self.distance_band_size = distance_band_size
         self.obstacles = obstacles or []
         self.paths = paths or []
 
@@ -343,7 +898,7 @@ if __name__ == "__main__":
                 # Show path to the spot
                 path = pf.get_path_to_position(closest_spot)
                 print(f"Path to parking spot: {path}")
-                print(f"Distance: {pf.distance_matrix[closest_spot[0]][closest_spot[1]]}")
+                print(f"Distance: {pf.distance_matrix[closest_spot]}")
         else:
             print(f"No available parking spots for vehicle {i+1}")
         print()
@@ -363,7 +918,7 @@ if __name__ == "__main__":
             print(f"  {key}: {value}")
     
     # Test removing a parked vehicle
-    if pf.parked_list:
+    if pf.parked_positions:
         removed_pos = pf.parked_list[0]
         print(f"\nRemoving vehicle from {removed_pos}")
         pf.remove_parked_position(removed_pos)
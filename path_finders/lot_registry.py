@@ -0,0 +1,195 @@
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .base_path_finder import PARKED, PathFinder, PathFinderConfig
+from .state_store import LotStateStore
+from .vehicle_index import VehicleAlreadyParked, VehicleIndex
+
+
+class ParkingLot:
+    """
+    One lot: its PathFinder plus the lock that serializes access to it
+
+    Hold `lock` around every PathFinder call; lots never share a lock, so
+    traffic on one lot does not wait for another. Spots taken with a plate
+    are recorded in `vehicles`, usually the VehicleIndex shared by all lots;
+    a plate that already holds a spot raises VehicleAlreadyParked and
+    reserves nothing.
+    """
+
+    def __init__(self, lot_id: str, path_finder: PathFinder, vehicles: Optional[VehicleIndex] = None):
+        self.lot_id = lot_id
+        self.path_finder = path_finder
+        self.vehicles = vehicles if vehicles is not None else VehicleIndex()
+        self.lock = threading.RLock()
+
+    def allocate(self, entrance: Optional[int] = None, plate: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """Atomically pick and reserve the closest free spot, or None when the lot is full"""
+        with self.lock:
+            self._check_not_parked([plate])
+            position = self.path_finder.allocate_spot(entrance)
+            if position is not None:
+                self._assign_plates([plate], [position])
+            return position
+
+    def allocate_many(self, count: int, entrance: Optional[int] = None, adjacent: bool = False,
+                      zone: Optional[str] = None, plates: Optional[List[str]] = None
+                      ) -> Optional[List[Tuple[int, int]]]:
+        """Atomically reserve count spots (see PathFinder.allocate_spots), or None if they do not fit"""
+        with self.lock:
+            self._check_not_parked(plates or [])
+            positions = self.path_finder.allocate_spots(count, entrance, adjacent, zone)
+            if positions is not None:
+                self._assign_plates(plates or [], positions)
+            return positions
+
+    def park(self, position: Tuple[int, int], plate: Optional[str] = None) -> bool:
+        """Reserve a given spot; False if it is taken or not parkable"""
+        with self.lock:
+            self._check_not_parked([plate])
+            if not self.path_finder.park_vehicle(position):
+                return False
+            self._assign_plates([plate], [position])
+            return True
+
+    def _check_not_parked(self, plates: List[Optional[str]]):
+        """Fail fast, before reserving anything, for a plate that already holds a spot"""
+        for plate in plates:
+            if plate is not None and plate in self.vehicles:
+                raise VehicleAlreadyParked(plate, self.vehicles.spot_of(plate))
+
+    def _assign_plates(self, plates: List[Optional[str]], positions: List[Tuple[int, int]]):
+        """
+        Link plates to the spots just reserved for them, all or nothing
+
+        The check and the link are one step in the index (try_assign), so a
+        plate parked concurrently through another lot is still caught; the
+        spots are then released again and VehicleAlreadyParked is raised.
+        """
+        assigned = []
+        for plate, position in zip(plates, positions):
+            if plate is None:
+                continue
+            if not self.vehicles.try_assign(plate, self.lot_id, position):
+                for done in assigned:
+                    self.vehicles.release_spot(self.lot_id, done)
+                for reserved in positions:
+                    self.path_finder.remove_parked_position(reserved)
+                raise VehicleAlreadyParked(plate, self.vehicles.spot_of(plate))
+            assigned.append(position)
+
+    def unpark(self, position: Tuple[int, int]) -> bool:
+        """Release a spot; False if nothing was parked there"""
+        with self.lock:
+            if not self.path_finder.remove_parked_position(position):
+                return False
+            self.vehicles.release_spot(self.lot_id, position)
+            return True
+
+    def unpark_plate(self, plate: str) -> Optional[Tuple[int, int]]:
+        """Release the spot of a plate parked in this lot; returns the spot, or None"""
+        with self.lock:
+            spot = self.vehicles.spot_of(plate)
+            if spot is None or spot[0] != self.lot_id or not self.unpark(spot[1]):
+                return None
+            return spot[1]
+
+
+class LotRegistry:
+    """
+    The parking lots of a site, by lot id
+
+    Config.lots maps lot ids to dicts with map_size, initial_pos and optional
+    entrances, obstacles, paths and zones. Without it there is a single lot,
+    Config.default_lot_id, built from Config's own map settings.
+
+    With Config.state_dir set, each lot persists its statuses under
+    state_dir/<lot id> and recovers them on the next start.
+
+    `vehicles` maps plates to spots across all lots.
+    """
+
+    def __init__(self, config):
+        self.default_lot_id = getattr(config, 'default_lot_id', 'main')
+        self.lots: Dict[str, ParkingLot] = {}
+        self.vehicles = VehicleIndex()
+        self.state_dir = getattr(config, 'state_dir', None)
+        self.state_sync = getattr(config, 'state_sync', 'flush')
+        self.state_snapshot_interval = getattr(config, 'state_snapshot_interval', 10000)
+
+        route_cache_size = getattr(config, 'route_cache_size', 1024)
+        distance_band_size = getattr(config, 'distance_band_size', 10)
+        lots = getattr(config, 'lots', None)
+        if not lots:
+            self.add_lot(self.default_lot_id, config)
+            return
+        for lot_id, lot in lots.items():
+            lot_config = PathFinderConfig(map_size=tuple(lot['map_size']),
+                                          initial_pos=tuple(lot['initial_pos']),
+                                          obstacles=lot.get('obstacles'),
+                                          paths=lot.get('paths'),
+                                          entrances=lot.get('entrances'),
+                                          zones=lot.get('zones'),
+                                          distance_band_size=distance_band_size)
+            lot_config.route_cache_size = route_cache_size
+            self.add_lot(lot_id, lot_config)
+        if self.default_lot_id not in self.lots:
+            self.default_lot_id = next(iter(self.lots))
+
+    def add_lot(self, lot_id: str, config) -> ParkingLot:
+        store = None
+        if self.state_dir:
+            store = LotStateStore(os.path.join(self.state_dir, lot_id), sync=self.state_sync,
+                                  snapshot_interval=self.state_snapshot_interval)
+        lot = ParkingLot(lot_id, PathFinder(config, store=store), self.vehicles)
+        self.lots[lot_id] = lot
+        return lot
+
+    def unpark_plate(self, plate: str) -> Optional[Tuple[str, Tuple[int, int]]]:
+        """Release whichever spot a plate holds; returns (lot id, (x, y)), or None if it is not parked"""
+        spot = self.vehicles.spot_of(plate)
+        if spot is None or spot[0] not in self.lots:
+            return None
+        position = self.lots[spot[0]].unpark_plate(plate)
+        return None if position is None else (spot[0], position)
+
+    def restore_vehicles(self, events: Iterable[Tuple[str, Optional[str], Tuple[int, int]]]) -> int:
+        """
+        Rebuild the plate index from (plate, lot id, (x, y)) park events, oldest first
+
+        Events whose spot is not currently parked (per the recovered lot
+        state) are skipped; a later event for the same plate or spot replaces
+        an earlier one. A None lot id means the default lot. Returns the
+        number of plates indexed.
+        """
+        self.vehicles.clear()
+        for plate, lot_id, position in events:
+            lot = self.lots.get(self.default_lot_id if lot_id is None else lot_id)
+            if lot is None:
+                continue
+            x, y = position
+            width, height = lot.path_finder.map_size
+            if 0 <= x < width and 0 <= y < height and lot.path_finder.status_matrix[x, y] == PARKED:
+                self.vehicles.assign(plate, lot.lot_id, (x, y))
+        return len(self.vehicles)
+
+    def close(self):
+        """Snapshot and close every lot's state store"""
+        for lot in self:
+            with lot.lock:
+                if lot.path_finder.store is not None:
+                    lot.path_finder.store.close()
+
+    def get(self, lot_id: Optional[str] = None) -> ParkingLot:
+        """The lot with this id (the default lot for None); KeyError if unknown"""
+        return self.lots[self.default_lot_id if lot_id is None else lot_id]
+
+    def __contains__(self, lot_id: str) -> bool:
+        return lot_id in self.lots
+
+    def __iter__(self) -> Iterator[ParkingLot]:
+        return iter(self.lots.values())
+
+    def __len__(self) -> int:
+        return len(self.lots)
@@ -0,0 +1,143 @@
+from array import array
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class SpotAllocator:
+    """
+    Indexed min-heap of the free parking cells, ordered by (distance, x, y)
+
+    Each cell is in the heap at most once, and a position index per cell
+    makes allocate, free and distance updates O(log n). Memory is bounded by
+    the lot size: the heap holds one int per free cell, and the index holds
+    one int64 per cell.
+
+    Keys are packed into a single int, distance * cells + x * height + y, so
+    comparing two keys compares (distance, x, y) in that order.
+    """
+
+    def __init__(self, map_size: Tuple[int, int]):
+        self.width, self.height = map_size
+        self.cells = self.width * self.height
+        self._heap = []  # Packed keys
+        self._index = array('q', [-1]) * self.cells  # Heap slot of each cell, -1 when not free
+
+    @classmethod
+    def from_arrays(cls, map_size: Tuple[int, int], xs: np.ndarray, ys: np.ndarray,
+                    distances: np.ndarray) -> 'SpotAllocator':
+        """Build from arrays of free cells in O(n log n) with a single sort"""
+        allocator = cls(map_size)
+        cells = np.asarray(xs, dtype=np.int64) * allocator.height + np.asarray(ys, dtype=np.int64)
+        keys = np.sort(np.asarray(distances, dtype=np.int64) * allocator.cells + cells)
+        # A sorted array is a valid heap
+        allocator._heap = keys.tolist()
+        index = np.full(allocator.cells, -1, dtype=np.int64)
+        index[keys % allocator.cells] = np.arange(keys.size)
+        allocator._index = array('q', index.tobytes())
+        return allocator
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, position: Tuple[int, int]) -> bool:
+        return self._index[position[0] * self.height + position[1]] >= 0
+
+    def _position(self, key: int) -> Tuple[int, int]:
+        return divmod(key % self.cells, self.height)
+
+    def peek(self) -> Optional[Tuple[int, int]]:
+        """Closest free cell, or None when the lot is full"""
+        return self._position(self._heap[0]) if self._heap else None
+
+    def pop(self) -> Optional[Tuple[int, int]]:
+        """Remove and return the closest free cell"""
+        if not self._heap:
+            return None
+        position = self._position(self._heap[0])
+        self.remove(position)
+        return position
+
+    def distance(self, position: Tuple[int, int]) -> Optional[int]:
+        """Distance the cell is keyed by, or None when it is not free"""
+        slot = self._index[position[0] * self.height + position[1]]
+        return self._heap[slot] // self.cells if slot >= 0 else None
+
+    def add(self, position: Tuple[int, int], distance: int) -> bool:
+        """Mark a cell free; returns False if it already was"""
+        cell = position[0] * self.height + position[1]
+        if self._index[cell] >= 0:
+            return False
+        self._heap.append(distance * self.cells + cell)
+        self._index[cell] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+        return True
+
+    def remove(self, position: Tuple[int, int]) -> bool:
+        """Take a cell out of the free set; returns False if it was not free"""
+        cell = position[0] * self.height + position[1]
+        slot = self._index[cell]
+        if slot < 0:
+            return False
+        self._index[cell] = -1
+        last = self._heap.pop()
+        if slot < len(self._heap):
+            # Move the last key into the hole and restore the heap around it
+            self._heap[slot] = last
+            self._index[last % self.cells] = slot
+            self._sift_up(slot)
+            self._sift_down(self._index[last % self.cells])
+        return True
+
+    def update(self, position: Tuple[int, int], distance: int) -> bool:
+        """Re-key a free cell after its distance changed; returns False if it is not free"""
+        cell = position[0] * self.height + position[1]
+        slot = self._index[cell]
+        if slot < 0:
+            return False
+        key = distance * self.cells + cell
+        old = self._heap[slot]
+        self._heap[slot] = key
+        if key < old:
+            self._sift_up(slot)
+        elif key > old:
+            self._sift_down(slot)
+        return True
+
+    def clear(self):
+        for key in self._heap:
+            self._index[key % self.cells] = -1
+        self._heap = []
+
+    def _sift_up(self, slot: int):
+        heap, index, cells = self._heap, self._index, self.cells
+        key = heap[slot]
+        while slot > 0:
+            parent = (slot - 1) >> 1
+            parent_key = heap[parent]
+            if parent_key <= key:
+                break
+            heap[slot] = parent_key
+            index[parent_key % cells] = slot
+            slot = parent
+        heap[slot] = key
+        index[key % cells] = slot
+
+    def _sift_down(self, slot: int):
+        heap, index, cells = self._heap, self._index, self.cells
+        size = len(heap)
+        key = heap[slot]
+        while True:
+            child = 2 * slot + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            child_key = heap[child]
+            if key <= child_key:
+                break
+            heap[slot] = child_key
+            index[child_key % cells] = slot
+            slot = child
+        heap[slot] = key
+        index[key % cells] = slot
@@ -0,0 +1,143 @@
+import glob
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+# One write-ahead log record: sequence number, x, y, new status
+RECORD = struct.Struct('<Qiib')
+RECORD_DTYPE = np.dtype([('seq', '<u8'), ('x', '<i4'), ('y', '<i4'), ('status', 'i1')])
+
+SYNC_MODES = ('always', 'flush', 'none')
+
+
+class LotStateStore:
+    """
+    Crash-recoverable cell statuses of one lot: binary snapshots plus an append-only log
+
+    Every status change (park, unpark, map edit) is appended to wal.log as a
+    fixed-size record before the call returns. Every snapshot_interval records
+    the whole int8 status grid is written to snapshot-<seq>.npy (tmp file +
+    rename, so a snapshot is either complete or absent) and the log restarts.
+    Recovery memory-maps the newest snapshot and replays the log records
+    after it with one vectorized assignment.
+
+    sync controls durability of each record:
+        'always' - fsync per record, survives power loss
+        'flush'  - write to the OS per record, survives a process crash
+        'none'   - buffered, only snapshots and close() are durable
+    """
+
+    def __init__(self, directory: str, sync: str = 'flush', snapshot_interval: int = 10000):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}")
+        self.directory = directory
+        self.sync = sync
+        self.snapshot_interval = snapshot_interval
+        self.log_path = os.path.join(directory, 'wal.log')
+        os.makedirs(directory, exist_ok=True)
+
+        self.seq = 0  # Last sequence number written
+        self.snapshot_seq = 0  # Sequence number the newest snapshot includes
+        self.records_since_snapshot = 0
+        self.grid = None
+        self._log = None
+
+    def _snapshot_paths(self):
+        """Complete snapshots, oldest first"""
+        return sorted(glob.glob(os.path.join(self.directory, 'snapshot-*.npy')))
+
+    def _read_log(self) -> np.ndarray:
+        if not os.path.exists(self.log_path):
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        with open(self.log_path, 'rb') as f:
+            data = f.read()
+        # A torn final record (crash mid-write) is dropped
+        usable = len(data) - len(data) % RECORD.size
+        return np.frombuffer(data[:usable], dtype=RECORD_DTYPE)
+
+    def recover(self, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        The last saved status grid: newest snapshot with the log tail replayed
+
+        Returns None if nothing was saved yet or the saved grid has a different shape.
+        """
+        snapshots = self._snapshot_paths()
+        if not snapshots:
+            return None
+        snapshot = np.load(snapshots[-1], mmap_mode='r')
+        if snapshot.shape != tuple(shape):
+            print(f"Warning: saved lot state in {self.directory} has shape {snapshot.shape}, "
+                  f"expected {tuple(shape)}; starting from the configured map")
+            return None
+        grid = np.array(snapshot, dtype=np.int8)
+        self.snapshot_seq = self.seq = int(os.path.basename(snapshots[-1])[len('snapshot-'):-len('.npy')])
+
+        records = self._read_log()
+        tail = records[records['seq'] > self.snapshot_seq]
+        if tail.size:
+            # Keep the last record per cell, then apply them all at once
+            cells = tail['x'].astype(np.int64) * shape[1] + tail['y']
+            _, last = np.unique(cells[::-1], return_index=True)
+            last = tail.size - 1 - last
+            grid[tail['x'][last], tail['y'][last]] = tail['status'][last]
+            self.seq = int(tail['seq'][-1])
+        self.records_since_snapshot = int(tail.size)
+        return grid
+
+    def attach(self, grid: np.ndarray):
+        """Start logging changes to grid; writes a first snapshot if none matches it"""
+        self.grid = grid
+        snapshots = self._snapshot_paths()
+        if not snapshots or np.load(snapshots[-1], mmap_mode='r').shape != grid.shape:
+            self.write_snapshot()
+            return
+        # Cut a torn final record so new records stay aligned
+        if os.path.exists(self.log_path):
+            size = os.path.getsize(self.log_path)
+            if size % RECORD.size:
+                with open(self.log_path, 'r+b') as f:
+                    f.truncate(size - size % RECORD.size)
+        self._log = open(self.log_path, 'ab')
+
+    def append(self, x: int, y: int, status: int):
+        """Log one status change; snapshots and restarts the log every snapshot_interval records"""
+        self.seq += 1
+        self._log.write(RECORD.pack(self.seq, x, y, status))
+        if self.sync != 'none':
+            self._log.flush()
+            if self.sync == 'always':
+                os.fsync(self._log.fileno())
+        self.records_since_snapshot += 1
+        if self.records_since_snapshot >= self.snapshot_interval:
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        """Persist the whole grid at the current sequence number and start an empty log"""
+        path = os.path.join(self.directory, f'snapshot-{self.seq:016d}.npy')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self.grid)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        # Records up to self.seq are now in the snapshot; older snapshots are obsolete
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, 'wb')
+        for old in self._snapshot_paths():
+            if old != path:
+                os.remove(old)
+        self.snapshot_seq = self.seq
+        self.records_since_snapshot = 0
+
+    def close(self):
+        """Write a final snapshot so the next start replays nothing"""
+        if self._log is None:
+            return
+        if self.records_since_snapshot:
+            self.write_snapshot()
+        self._log.close()
+        self._log = None
@@ -0,0 +1,99 @@
+import re
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+# (lot id, (x, y))
+Spot = Tuple[str, Tuple[int, int]]
+
+# Separators OCR and manual entry add or drop between plate characters
+_PLATE_SEPARATORS = re.compile(r'[\s.\-_]+')
+
+
+def normalize_plate(plate: str) -> str:
+    """Canonical form of a plate for lookups: upper case without spaces, dots or dashes"""
+    return _PLATE_SEPARATORS.sub('', str(plate)).upper()
+
+
+class VehicleAlreadyParked(Exception):
+    """A plate was given a spot while it still holds another one"""
+
+    def __init__(self, plate: str, spot: Optional[Spot] = None):
+        self.plate = plate
+        self.spot = spot
+        where = f" at {spot[1]} in lot '{spot[0]}'" if spot is not None else ""
+        super().__init__(f"Vehicle {plate} is already parked{where}")
+
+
+class VehicleIndex:
+    """
+    Which vehicle is parked where, across all lots: plate <-> (lot id, (x, y))
+
+    Both directions are dicts, so every lookup and update is O(1). ParkingLot
+    updates it under the lot lock whenever a spot with a known plate is taken
+    or released; the index's own lock only keeps the two dicts consistent
+    with each other across lots. Plates are stored normalized (normalize_plate).
+    """
+
+    def __init__(self):
+        self._spots: Dict[str, Spot] = {}
+        self._plates: Dict[Spot, str] = {}
+        self._lock = threading.Lock()
+
+    def assign(self, plate: str, lot_id: str, position: Tuple[int, int]):
+        """Record plate at a spot, replacing whatever either side was linked to before"""
+        plate = normalize_plate(plate)
+        spot = (lot_id, (int(position[0]), int(position[1])))
+        with self._lock:
+            old_spot = self._spots.pop(plate, None)
+            if old_spot is not None:
+                del self._plates[old_spot]
+            old_plate = self._plates.pop(spot, None)
+            if old_plate is not None:
+                del self._spots[old_plate]
+            self._spots[plate] = spot
+            self._plates[spot] = plate
+
+    def try_assign(self, plate: str, lot_id: str, position: Tuple[int, int]) -> bool:
+        """Record plate at a spot unless the plate already holds one; False (and no change) if it does"""
+        plate = normalize_plate(plate)
+        spot = (lot_id, (int(position[0]), int(position[1])))
+        with self._lock:
+            if plate in self._spots:
+                return False
+            old_plate = self._plates.pop(spot, None)
+            if old_plate is not None:
+                del self._spots[old_plate]
+            self._spots[plate] = spot
+            self._plates[spot] = plate
+            return True
+
+    def release_spot(self, lot_id: str, position: Tuple[int, int]) -> Optional[str]:
+        """Forget the vehicle at a spot; returns its plate, or None if the spot had none"""
+        with self._lock:
+            plate = self._plates.pop((lot_id, (int(position[0]), int(position[1]))), None)
+            if plate is not None:
+                del self._spots[plate]
+            return plate
+
+    def spot_of(self, plate: str) -> Optional[Spot]:
+        """(lot id, (x, y)) where plate is parked, or None"""
+        return self._spots.get(normalize_plate(plate))
+
+    def plate_at(self, lot_id: str, position: Tuple[int, int]) -> Optional[str]:
+        """Plate parked at a spot, or None"""
+        return self._plates.get((lot_id, (int(position[0]), int(position[1]))))
+
+    def clear(self):
+        with self._lock:
+            self._spots.clear()
+            self._plates.clear()
+
+    def __contains__(self, plate: str) -> bool:
+        return normalize_plate(plate) in self._spots
+
+    def __iter__(self) -> Iterator[Tuple[str, Spot]]:
+        with self._lock:
+            return iter(list(self._spots.items()))
+
+    def __len__(self) -> int:
+        return len(self._spots)
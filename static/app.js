@@ -302,40 +302,40 @@ async function detectPlate() {
   }
 
   try {
-    // Convert image to base64
-    const base64Image = await readFileAsDataURL(file);
-    
-    let detectionData, parkingData;
+    let detectionData, parkingData, parkingError;
     
     try {
-      // Call API for plate detection
-      const detectionResponse = await fetch("http://localhost:8000/predict/base64/", {
+      // Call API for plate detection: raw image bytes in, annotated JPEG out,
+      // plate texts in a response header (no base64 either way)
+      const detectionResponse = await fetch("http://localhost:8000/predict/binary/", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ image: base64Image }),
+        headers: { "Content-Type": "application/octet-stream", "Accept": "image/jpeg" },
+        body: file,
       });
       
-      detectionData = await detectionResponse.json();
+      const plateTexts = JSON.parse(detectionResponse.headers.get("X-Plate-Texts") || "[]");
+      const resultImage = await detectionResponse.blob();
+      detectionData = {
+        success: detectionResponse.ok,
+        plate_texts: plateTexts,
+        num_plates_detected: plateTexts.length,
+        result_image_url: resultImage.size ? URL.createObjectURL(resultImage) : null,
+      };
       
-      // Find parking spot
-      const parkingResponse = await fetch("http://localhost:8000/find_shortest_parking_lot", {
+      // Find parking spot; the plate lets /vehicles/{plate} and plate-only exits find it later
+      const plateQuery = plateTexts.length ? "?number_plate=" + encodeURIComponent(plateTexts[0]) : "";
+      const parkingResponse = await fetch("http://localhost:8000/find_shortest_parking_lot" + plateQuery, {
         method: "POST",
       });
       
-      parkingData = await parkingResponse.json();
-      const x = parkingData['location'][0];
-      const y = parkingData['location'][1];
-      const position = idx2word[y] + String(x);
-
-      const historyResponse = await fetch("http://localhost:8000/history", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-        number_plate: detectionData['plate_texts'][0],
-        position: position,
-        status: 'Parked',
-      })
-    })
+      // The server records the "Parked" history row itself
+      if (parkingResponse.ok) {
+        parkingData = await parkingResponse.json();
+      } else {
+        // e.g. 409 when the plate is already parked, 404 when the lot is full
+        const { detail } = await parkingResponse.json().catch(() => ({}));
+        parkingError = detail || "No parking spot could be allocated";
+      }
 
     } catch (networkError) {
       console.warn("Backend not available, using mock data");
@@ -344,7 +344,7 @@ async function detectPlate() {
         success: true,
         num_plates_detected: 1,
         plate_texts: ["ABC123"],
-        result_images: [base64Image.split(',')[1]] // Use uploaded image as result
+        result_image_url: await readFileAsDataURL(file) // Use uploaded image as result
       };
       
 
@@ -368,17 +368,22 @@ async function detectPlate() {
     }
 
     // Show detection result
-    if (output && detectionData.result_images?.[0]) {
-      output.src = "data:image/jpeg;base64," + detectionData.result_images[0];
+    if (output && detectionData.result_image_url) {
+      output.src = detectionData.result_image_url;
       output.style.display = "block";
     }
     
+    if (parkingError) {
+      throw new Error(parkingError);
+    }
+    
     const [x, y] = parkingData.location;
     const plateText = detectionData.plate_texts?.[0] || "UNKNOWN";
     
     // Highlight the allocated spot
     if (x !== undefined && y !== undefined && gridData[x]?.[y] === "empty") {
       highlightParkingSpot(x, y, plateText);
+      showRoute(x, y);
       showAlert("Parking spot allocated successfully!", "success");
     } else {
       showAlert("No available parking spots found.", "warning");
@@ -441,6 +446,27 @@ function highlightParkingSpot(x, y, plate) {
   updateStatus();
 }
 
+// Outline the route from the entrance to the allocated spot for a few seconds
+async function showRoute(x, y) {
+  try {
+    const response = await fetch(`http://localhost:8000/route/${x}/${y}`);
+    if (!response.ok) {
+      // e.g. "Location (x, y) is not reachable" after a map edit
+      const { detail } = await response.json().catch(() => ({}));
+      showAlert(detail || "Route not available", "error");
+      return;
+    }
+    const { route } = await response.json();
+    const cells = route
+      .map(([r, c]) => document.querySelector(`.cell[data-row='${r}'][data-col='${c}']`))
+      .filter(Boolean);
+    cells.forEach(cell => cell.classList.add("route"));
+    setTimeout(() => cells.forEach(cell => cell.classList.remove("route")), 5000);
+  } catch (error) {
+    console.warn("Route not available:", error);
+  }
+}
+
 // Show alert message
 function showAlert(message, type = "info") {
   // Remove existing alerts
@@ -0,0 +1,78 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from path_finders import ParkingLot, PathFinder, PathFinderConfig
+from path_finders.base_path_finder import PARKED
+
+
+def garage(side):
+    """Square lot with a road every third row and along the first column"""
+    paths = [(x, y) for y in range(1, side, 3) for x in range(side)] + [(0, y) for y in range(side)]
+    return PathFinderConfig(map_size=(side, side), initial_pos=(0, 0), paths=paths,
+                            entrances=[(0, side - 1)])
+
+
+@pytest.fixture
+def fast_switching():
+    # Switch threads far more often than the default 5 ms so allocations interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+# Races show up in most rounds without the lot lock; several rounds make a miss unlikely
+@pytest.mark.parametrize('round', range(5))
+def test_concurrent_allocations_never_double_book(fast_switching, round):
+    lot = ParkingLot('main', PathFinder(garage(30)))
+    capacity = lot.path_finder.free_spots
+    threads = 32
+    start = threading.Barrier(threads)
+
+    def worker(index):
+        start.wait()
+        positions = []
+        while True:
+            position = lot.allocate(entrance=index % 2)
+            if position is None:
+                return positions
+            positions.append(position)
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+
+    positions = [position for result in results for position in result]
+    assert len(positions) == len(set(positions))
+    assert len(positions) == capacity
+    assert int(np.count_nonzero(lot.path_finder.status_matrix == PARKED)) == len(positions)
+    assert set(lot.path_finder.parked_positions) == set(positions)
+    assert lot.path_finder.free_spots == 0
+
+
+def test_concurrent_allocation_with_churn(fast_switching):
+    lot = ParkingLot('main', PathFinder(garage(30)))
+    threads = 16
+    start = threading.Barrier(threads)
+
+    def worker(index):
+        start.wait()
+        held = []
+        for i in range(400):
+            if held and i % 3 == 0:
+                assert lot.unpark(held.pop(0))
+            position = lot.allocate()
+            if position is not None:
+                held.append(position)
+        return held
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+
+    held = [position for result in results for position in result]
+    assert len(held) == len(set(held))
+    assert int(np.count_nonzero(lot.path_finder.status_matrix == PARKED)) == len(held)
+    assert set(lot.path_finder.parked_positions) == set(held)
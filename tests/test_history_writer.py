@@ -0,0 +1,70 @@
+import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from history_writer import HistoryWriter
+from models import History
+
+
+class WriterConfig:
+    history_batch_size = 100
+    history_flush_interval_ms = 20
+    history_queue_size = 1000
+
+
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def row(plate, position="1,2"):
+    return {"number_plate": plate, "position": position, "status": "Parked", "time": datetime.datetime.now()}
+
+
+def plates(Session):
+    with Session() as db:
+        return sorted(db.scalars(select(History.number_plate)).all())
+
+
+def test_a_bad_row_is_dropped_without_blocking_the_rest():
+    Session = session_factory()
+    writer = HistoryWriter(Session, WriterConfig())
+    writer.start()
+    writer.submit(row("GOOD1"))
+    writer.submit(row("BAD", position=[3, 4]))  # SQLite cannot bind a list
+    writer.submit_many([row("GOOD2"), row("GOOD3")])
+    writer.flush()
+    writer.submit(row("GOOD4"))
+    writer.flush()
+    writer.stop()
+
+    assert plates(Session) == ["GOOD1", "GOOD2", "GOOD3", "GOOD4"]
+    stats = writer.get_stats()
+    assert stats["rows_dropped"] == 1
+    assert stats["rows_pending"] == 0
+
+
+def test_transient_errors_are_retried():
+    Session = session_factory()
+    failures = []
+
+    def flaky_session():
+        if len(failures) < 3:
+            failures.append(1)
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return Session()
+
+    writer = HistoryWriter(flaky_session, WriterConfig())
+    writer.retry_interval = 0.01
+    writer.start()
+    writer.submit(row("GOOD1"))
+    writer.flush()
+    writer.stop()
+
+    assert plates(Session) == ["GOOD1"]
+    assert writer.get_stats()["rows_dropped"] == 0
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from path_finders import PathFinder, PathFinderConfig
+from path_finders.base_path_finder import EMPTY, OBSTACLE, PARKED, PATH_ONLY, UNREACHABLE
+
+
+def lot_config():
+    side = 24
+    paths = [(x, y) for y in range(1, side, 4) for x in range(side)]
+    zones = {'north': (0, 0, 11, 11), 'south': (12, 0, 23, 23), 'corner': (20, 20, 23, 23)}
+    return PathFinderConfig(map_size=(side, side), initial_pos=(0, 0), paths=paths,
+                            entrances=[(23, 0)], zones=zones, distance_band_size=4)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_counters_match_full_scan_after_every_operation(seed):
+    rng = random.Random(seed)
+    pf = PathFinder(lot_config())
+    width, height = pf.map_size
+    assert pf.check_counters() == []
+
+    for _ in range(600):
+        operation = rng.random()
+        if operation < 0.3:
+            pf.park_vehicle((rng.randrange(width), rng.randrange(height)))
+        elif operation < 0.5 and pf.parked_positions:
+            pf.remove_parked_position(rng.choice(list(pf.parked_positions)))
+        elif operation < 0.7:
+            pf.allocate_spots(rng.randint(1, 4), entrance=rng.choice([None, 0, 1]),
+                              adjacent=rng.random() < 0.5, zone=rng.choice([None, 'north', 'south', 'corner']))
+        else:
+            # Obstacles cut off parts of the lot and reopen them, moving spots between bands
+            pf.set_cell_type((rng.randrange(width), rng.randrange(height)),
+                             rng.choice([EMPTY, EMPTY, OBSTACLE, PATH_ONLY]))
+        assert pf.check_counters() == []
+
+    # Vehicles walled off by obstacles are not counted, as in get_parking_status
+    occupancy = pf.get_occupancy()
+    reachable = pf.distance_matrix != UNREACHABLE
+    assert occupancy['parked_spots'] == int((reachable & (pf.status_matrix == PARKED)).sum())
+    assert occupancy['empty_spots'] == int((reachable & (pf.status_matrix == EMPTY)).sum())
+    assert sum(band['parked_spots'] for band in occupancy['distance_bands']) == occupancy['parked_spots']
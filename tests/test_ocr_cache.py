@@ -0,0 +1,91 @@
+import random
+
+import cv2
+import numpy as np
+import pytest
+
+from model.ocr_cache import PlateOCRCache, plate_hash
+
+
+def flip_bits(key, bits, rng):
+    for bit in rng.sample(range(64), bits):
+        key ^= 1 << bit
+    return key
+
+
+def render_plate(text):
+    image = np.full((60, 240, 3), 235, np.uint8)
+    cv2.rectangle(image, (0, 0), (239, 59), (20, 20, 20), 2)
+    cv2.putText(image, text, (12, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.3, (10, 10, 10), 3)
+    return image
+
+
+def test_default_is_exact_hash_only():
+    cache = PlateOCRCache(16, 60.0)
+    cache.put(0b1011, "51A12345", 0.9)
+    assert cache.get(0b1011) == ("51A12345", 0.9)
+    # One bit away is a different plate as far as the default cache knows
+    assert cache.get(0b1010) is None
+
+
+@pytest.mark.parametrize('quality', [95, 90, 80])
+def test_recompressed_crop_hits_the_default_cache(quality):
+    plate = render_plate("51A12345")
+    _, encoded = cv2.imencode('.jpg', plate, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    recompressed = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    cache = PlateOCRCache(16, 60.0)
+    cache.put(plate_hash(plate), "51A12345", 0.9)
+    assert cache.get(plate_hash(recompressed)) == ("51A12345", 0.9)
+
+
+def test_plate_one_character_away_misses_the_default_cache():
+    first, second = plate_hash(render_plate("51A12345")), plate_hash(render_plate("51A12346"))
+    # Only one bit apart, which is why near matching is off by default
+    assert bin(first ^ second).count("1") == 1
+    cache = PlateOCRCache(16, 60.0)
+    cache.put(first, "51A12345", 0.9)
+    assert cache.get(second) is None
+
+
+@pytest.mark.parametrize('max_distance', [1, 3, 7])
+def test_near_match_agrees_with_a_full_scan(max_distance):
+    rng = random.Random(max_distance)
+    cache = PlateOCRCache(256, 60.0, max_distance)
+    keys = [rng.getrandbits(64) for _ in range(256)]
+    texts = {key: f"PLATE{i}" for i, key in enumerate(keys)}
+    for key in keys:
+        cache.put(key, texts[key], 0.9)
+
+    for _ in range(2000):
+        query = flip_bits(rng.choice(keys), rng.randint(0, max_distance + 2), rng)
+        distances = {key: bin(key ^ query).count("1") for key in keys}
+        closest = min(distances.values())
+        best = {texts[key] for key, distance in distances.items() if distance == closest}
+        expected = best.pop() if closest <= max_distance and len(best) == 1 else None
+        result = cache.get(query)
+        assert (result[0] if result else None) == expected
+
+
+def test_equally_close_plates_with_different_texts_miss():
+    cache = PlateOCRCache(16, 60.0, 2)
+    cache.put(0b0001, "AAA111", 0.9)
+    cache.put(0b0010, "BBB222", 0.9)
+    assert cache.get(0b0000) is None
+    assert cache.get(0b0011) is None
+
+
+def test_eviction_removes_band_entries():
+    cache = PlateOCRCache(2, 60.0, 3)
+    for key in (0xFF, 0xFF00, 0xFF0000):
+        cache.put(key, str(key), 0.9)
+    assert cache.get(0xFF) is None
+    assert cache.get(0xFF | 1 << 40) is None
+    assert cache.get(0xFF0000 | 1 << 40) == (str(0xFF0000), 0.9)
+    assert sum(len(bucket) for bucket in cache._buckets.values()) == 2 * 4
+    cache.clear()
+    assert not cache._buckets
+
+
+def test_rejects_tolerances_the_bands_cannot_index():
+    with pytest.raises(ValueError):
+        PlateOCRCache(16, 60.0, 8)
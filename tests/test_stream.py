@@ -0,0 +1,70 @@
+import numpy as np
+import cv2
+import pytest
+
+from config import Config
+from model.stream import StreamRecognizer, read_frames
+
+WIDTH, HEIGHT = 320, 240
+# (first frame, last frame, x, y) of each plate: a white 60x20 box drifting right
+PLATES = [(0, 19, 20, 40), (10, 29, 40, 160)]
+
+
+class StubRecognizer:
+    """Detector finds the white boxes; the reader returns one text per box position"""
+    def __init__(self):
+        self.detector_calls = 0
+        self.ocr_crops = 0
+
+    def detect_batch(self, frames):
+        self.detector_calls += 1
+        detections = []
+        for frame in frames:
+            mask = (frame.min(axis=2) > 200).astype(np.uint8)
+            count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+            boxes = [[x, y, x + w, y + h] for x, y, w, h, area in stats[1:count] if area > 100]
+            boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+            detections.append((boxes, np.full(len(boxes), 0.9, dtype=np.float32)))
+        return detections
+
+    def crop_plates(self, frame, boxes):
+        return [frame[int(y1):int(y2), int(x1):int(x2)] for x1, y1, x2, y2 in boxes]
+
+    def read_plates(self, crops):
+        self.ocr_crops += len(crops)
+        return [f"PLATE{crop.shape[1]}" for crop in crops], np.full(len(crops), 0.95, dtype=np.float32)
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (WIDTH, HEIGHT))
+    assert writer.isOpened()
+    for frame_index in range(30):
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        for first, last, x, y in PLATES:
+            if first <= frame_index <= last:
+                x += 2 * (frame_index - first)
+                cv2.rectangle(frame, (x, y), (x + 59, y + 19), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_stream_reads_each_plate_once_per_track(video):
+    model = StubRecognizer()
+    stream = StreamRecognizer(model, Config())
+    events = list(stream.run(read_frames(video)))
+
+    assert len(events) == 30
+    assert model.detector_calls == 30
+    assert stream.tracker.tracks_created == len(PLATES)
+    # Every track is read once: its first read is confident enough
+    assert model.ocr_crops == len(PLATES)
+    new_plates = [(event['frame_index'], plate['track_id']) for event in events for plate in event['new_plates']]
+    assert new_plates == [(0, 0), (10, 1)]
+    assert all(len(event['tracks']) == 2 for event in events[10:20])
+
+
+def test_stride_skips_decoding(video):
+    assert [index for index, _ in read_frames(video, stride=3)] == list(range(0, 30, 3))
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from path_finders import ParkingLot, PathFinder, PathFinderConfig, VehicleAlreadyParked, VehicleIndex
+from path_finders.base_path_finder import PARKED
+
+
+def make_lots(count):
+    vehicles = VehicleIndex()
+    return [ParkingLot(f"lot-{i}", PathFinder(PathFinderConfig(map_size=(10, 10), initial_pos=(0, 0))), vehicles)
+            for i in range(count)]
+
+
+def parked_cells(lots):
+    return sum(int(np.count_nonzero(lot.path_finder.status_matrix == PARKED)) for lot in lots)
+
+
+def test_try_assign_refuses_a_parked_plate():
+    vehicles = VehicleIndex()
+    assert vehicles.try_assign("ab-123", "main", (1, 2))
+    assert not vehicles.try_assign("AB 123", "main", (3, 4))
+    assert vehicles.spot_of("AB123") == ("main", (1, 2))
+    assert vehicles.plate_at("main", (3, 4)) is None
+
+
+def test_same_plate_from_many_threads_gets_one_spot():
+    lots = make_lots(4)
+    threads = 32
+    start = threading.Barrier(threads)
+
+    def worker(index):
+        start.wait()
+        try:
+            return lots[index % len(lots)].allocate(plate="AB123")
+        except VehicleAlreadyParked:
+            return None
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = [position for position in pool.map(worker, range(threads)) if position is not None]
+
+    assert len(results) == 1
+    assert parked_cells(lots) == 1
+    lot_id, position = lots[0].vehicles.spot_of("AB123")
+    assert position == results[0]
+
+
+def test_conflict_rolls_back_the_reservation():
+    lot, other = make_lots(2)
+    assert other.park((3, 3), "AB123")
+    with pytest.raises(VehicleAlreadyParked):
+        lot.park((5, 5), "AB123")
+    with pytest.raises(VehicleAlreadyParked):
+        lot.allocate(plate="AB123")
+    with pytest.raises(VehicleAlreadyParked):
+        lot.allocate_many(3, plates=["CD456", "AB123", "EF789"])
+    # A duplicate inside one batch is caught after reserving, and undone the same way
+    with pytest.raises(VehicleAlreadyParked):
+        lot.allocate_many(2, plates=["GH012", "GH012"])
+    assert parked_cells([lot]) == 0
+    assert len(lot.vehicles) == 1
+    assert lot.unpark_plate("AB123") is None
+    assert other.unpark_plate("AB123") == (3, 3)
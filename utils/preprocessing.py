@@ -1,8 +1,116 @@
+import io
+from typing import Optional, Tuple
+
 import numpy as np
 import cv2
 
+try:
+    from PIL import Image
+except ImportError:  # Header probing is optional; without it images decode at full size
+    Image = None
+
+# Largest reduction first: JPEG is decoded directly at 1/8, 1/4 or 1/2 scale (DCT scaling)
+REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+def encoded_image_size(contents: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) of an encoded image read from its header only, or None if unknown"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(contents)) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def decode_image(contents: bytes, min_size: Optional[Tuple[int, int]] = None) -> Optional[np.ndarray]:
+    """
+    Decode encoded image bytes straight into the BGR uint8 layout the detector expects
+
+    Args:
+        contents: encoded image (JPEG, PNG, ...)
+        min_size: (width, height) the caller needs; when the image is at least 2x, 4x or 8x
+            larger, it is decoded at the largest reduced scale that still covers min_size
+
+    Returns:
+        BGR image, or None if the bytes are not a decodable image
+    """
+    flag = cv2.IMREAD_COLOR
+    if min_size is not None:
+        size = encoded_image_size(contents)
+        if size is not None:
+            for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+                if size[0] // factor >= min_size[0] and size[1] // factor >= min_size[1]:
+                    flag = reduced_flag
+                    break
+    return cv2.imdecode(np.frombuffer(contents, np.uint8), flag)
+
+
+def letterbox(image: np.ndarray, new_size: int = 640, color=(114, 114, 114)):
+    """
+    Resize an image to fit a new_size x new_size square, keeping its aspect ratio,
+    and pad the remainder (the layout YOLO is trained on)
+
+    Returns:
+        (padded image, scale ratio, (pad_left, pad_top))
+    """
+    height, width = image.shape[:2]
+    ratio = min(new_size / height, new_size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    if (new_width, new_height) != (width, height):
+        interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+        image = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+
+    pad_width, pad_height = (new_size - new_width) / 2, (new_size - new_height) / 2
+    top, bottom = int(round(pad_height - 0.1)), int(round(pad_height + 0.1))
+    left, right = int(round(pad_width - 0.1)), int(round(pad_width + 0.1))
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return padded, ratio, (left, top)
+
+
+def scale_boxes(boxes: np.ndarray, ratio: float, pad: Tuple[int, int], image_shape) -> np.ndarray:
+    """Map (N, 4) xyxy boxes from letterboxed coordinates back to the original image"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4).copy()
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes /= ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+    return boxes
+
 
+def postprocess_boxes(boxes: np.ndarray, scores: np.ndarray, image_shape, padding: int = 5,
+                      min_width: int = 1, min_height: int = 1,
+                      min_aspect: float = 0.0, max_aspect: float = float('inf')):
+    """
+    Pad, clamp and filter (N, 4) xyxy detector boxes in one vectorized pass
 
+    Boxes are padded by `padding` pixels, clamped to the image bounds and rounded
+    outwards to integer pixels. Boxes smaller than min_width x min_height or with a
+    width/height ratio outside [min_aspect, max_aspect] are dropped, so degenerate
+    boxes never produce empty or garbage crops.
 
+    Returns:
+        (int32 boxes (M, 4), scores (M,)) for the boxes that survive
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+    height, width = image_shape[:2]
 
+    x1 = np.floor(boxes[:, 0] - padding).clip(0, width)
+    y1 = np.floor(boxes[:, 1] - padding).clip(0, height)
+    x2 = np.ceil(boxes[:, 2] + padding).clip(0, width)
+    y2 = np.ceil(boxes[:, 3] + padding).clip(0, height)
 
+    box_width = x2 - x1
+    box_height = y2 - y1
+    aspect = box_width / np.maximum(box_height, 1)
+    keep = ((box_width >= min_width) & (box_height >= min_height)
+            & (aspect >= min_aspect) & (aspect <= max_aspect))
+    padded = np.stack([x1, y1, x2, y2], axis=1)
+    return padded[keep].astype(np.int32), scores[keep]